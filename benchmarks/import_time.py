@@ -0,0 +1,54 @@
+"""
+Benchmark the cold start cost of importing the data layer.
+
+Each sample imports the module in a fresh interpreter, so nothing is cached in sys.modules.
+
+Usage:
+    python benchmarks/import_time.py [--runs 20]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = {
+    "python": "pass",
+    "data_layer": "import data_layer",
+    "DictStore": "from data_layer import DictStore",
+    "ElasticStore": "from data_layer import ElasticStore",
+}
+
+TIMER = """
+import time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+import sys
+print(elapsed, 'elasticsearch' in sys.modules)
+"""
+
+
+def sample(statement: str) -> tuple[float, bool]:
+    """
+    Time a statement in a fresh interpreter.
+    :return: the elapsed seconds and whether elasticsearch was imported.
+    """
+    output = subprocess.run([sys.executable, "-c", TIMER.format(statement=statement)], check=True,
+                            capture_output=True, text=True).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'import':<14}{'median ms':>12}{'min ms':>10}  elasticsearch loaded")
+    for name, statement in STATEMENTS.items():
+        samples = [sample(statement) for _ in range(args.runs)]
+        times = [elapsed * 1000 for elapsed, _ in samples]
+        print(f"{name:<14}{statistics.median(times):>12.2f}{min(times):>10.2f}  {samples[0][1]}")
+
+
+if __name__ == "__main__":
+    main()
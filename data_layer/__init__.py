@@ -1,4 +1,23 @@
 from data_layer.entity import *
-from data_layer.stores import *
+from data_layer.stores import (Page, Store, ChangeEvent, ChangeType, LiveView, DictStore, CoalescingStore,
+                               CoalescingStats, MembershipStore, MembershipStats)
 from data_layer.filters import *
 from data_layer.filter_factory import FilterFactory
+from data_layer.filter_cache import FilterCache, FilterCacheStats
+from data_layer.bloom_filter import BloomFilter
+from data_layer.hydration import Hydrator, ExecutorType
+from data_layer.migration import copy_store, CopyProgress
+
+# Keep star imports exporting the optional backends whose dependencies are installed; they are only loaded when star
+# imported or accessed.
+__all__ = [name for name in globals() if not name.startswith("_")] + stores._available_lazy_stores()
+
+
+def __getattr__(name):
+    # Optional backends, e.g. ElasticStore, are loaded lazily by data_layer.stores.
+    import data_layer.stores
+    if name in data_layer.stores._lazy_stores:
+        value = getattr(data_layer.stores, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,57 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    A set membership filter with no false negatives and a tunable false positive rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """
+        :param capacity: the number of keys the filter is sized for.
+        :param error_rate: the false positive rate when the filter holds capacity keys.
+        """
+        if capacity < 1:
+            raise ValueError("BloomFilter capacity must be at least 1.")
+        if not 0 < error_rate < 1:
+            raise ValueError("BloomFilter error_rate must be between 0 and 1.")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key: str):
+        added = False
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def false_positive_rate(self) -> float:
+        """
+        The expected false positive rate for the number of keys added so far.
+        """
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
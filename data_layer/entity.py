@@ -1,5 +1,6 @@
 from abc import ABC, ABCMeta
-from dataclasses import dataclass, fields
+from dataclasses import dataclass, fields, Field
+from functools import cache
 
 from data_layer.util import parse
 
@@ -8,6 +9,7 @@ from data_layer.util import parse
 class MetaData:
     es_field_name: str = None
     es_keyword_field: str = None
+    filterable: bool = True
 
 
 class EntityMeta(ABCMeta):
@@ -22,6 +24,35 @@ class EntityMeta(ABCMeta):
 @dataclass
 class Entity(ABC, metaclass=EntityMeta):
 
+    def __setattr__(self, name, value):
+        dirty = self.__dict__.get("_dirty")
+        if dirty is not None:
+            dirty.add(name)
+        super().__setattr__(name, value)
+
+    def __copy__(self):
+        entity = self.__class__.__new__(self.__class__)
+        entity.__dict__.update(self.__dict__)
+        if "_dirty" in self.__dict__:
+            # The copy tracks its own modifications.
+            entity.__dict__["_dirty"] = set(self.__dict__["_dirty"])
+        return entity
+
+    def mark_clean(self):
+        """
+        Start tracking modified fields from the current state, e.g. after the entity was loaded from or written to a
+        store.
+        """
+        self.__dict__["_dirty"] = set()
+
+    def dirty_fields(self) -> list[str]:
+        """
+        Get the names of the fields set since the entity was loaded or last written.  All fields are dirty for entities
+        that were not loaded from a store.
+        """
+        dirty = self.__dict__.get("_dirty")
+        return [field.name for field in fields(self) if dirty is None or field.name in dirty]
+
     def to_dict(self):
         """
         Convert the entity to a dict.
@@ -40,17 +71,20 @@ class Entity(ABC, metaclass=EntityMeta):
         for field in fields(cls):
             field_value = data.get(field.name)
             params[field.name] = parse(value_type=field.type, value=field_value)
-        return cls(**params)
+        entity = cls(**params)
+        entity.mark_clean()
+        return entity
 
-    def to_es(self) -> dict:
+    def to_es(self, field_names: list[str] = None) -> dict:
         """
         Convert the entity to a dict suitable for elasticsearch.
+        :param field_names: only include these fields, e.g. the dirty fields for a partial update.
         """
         data = {}
-        for field in fields(self):
-            metadata = MetaData(**field.metadata)
-            field_name = metadata.es_field_name or field.name
-            data[field_name] = getattr(self, field.name)
+        for name, es_field_name, _ in _es_fields(type(self)):
+            if field_names is not None and name not in field_names:
+                continue
+            data[es_field_name] = getattr(self, name)
         return data
 
     @classmethod
@@ -61,9 +95,31 @@ class Entity(ABC, metaclass=EntityMeta):
         :return: an instance of the Entity class
         """
         params = {}
-        for field in fields(cls):
-            metadata = MetaData(**field.metadata)
-            field_name = metadata.es_field_name or field.name
-            field_value = data.get(field_name)
-            params[field.name] = parse(value_type=field.type, value=field_value)
-        return cls(**params)
+        for name, es_field_name, value_type in _es_fields(cls):
+            params[name] = parse(value_type=value_type, value=data.get(es_field_name))
+        entity = cls(**params)
+        entity.mark_clean()
+        return entity
+
+
+@cache
+def _es_fields(entity: type) -> tuple[tuple[str, str, type], ...]:
+    """
+    The name, elasticsearch field name and type of each field of an entity class, computed once per class.
+    """
+    return tuple((field.name, MetaData(**field.metadata).es_field_name or field.name, field.type)
+                 for field in fields(entity))
+
+
+@cache
+def field_identity(field: Field) -> str:
+    """
+    Identify a dataclass field by the entity class that defines it, e.g. "module.MyEntity.count".  Fields of different
+    entities with the same name are different fields; subclasses share the fields they inherit.
+    """
+    classes = [Entity]
+    for cls in classes:
+        if cls.__dict__.get("__dataclass_fields__", {}).get(field.name) is field:
+            return f"{cls.__module__}.{cls.__qualname__}.{field.name}"
+        classes.extend(type.__subclasses__(cls))
+    return f"{field.name}@{id(field):x}"
@@ -10,3 +10,24 @@ class InvalidOperatorError(Exception):
     @classmethod
     def for_operator(cls, operator):
         return cls(f"Invalid operator: {operator}")
+
+
+class ReadError(Exception):
+
+    @classmethod
+    def for_query(cls, index, error):
+        return cls(f"Read from index {index} failed: {error}")
+
+
+class CursorExpiredError(Exception):
+
+    @classmethod
+    def for_cursor(cls, cursor):
+        return cls(f"The point in time of scan cursor {cursor} has expired; the scan can not be resumed.")
+
+
+class UnsupportedOperationError(Exception):
+
+    @classmethod
+    def for_operation(cls, store, operation):
+        return cls(f"{store.__class__.__name__} does not support {operation}.")
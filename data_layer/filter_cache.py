@@ -0,0 +1,100 @@
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Type
+
+from data_layer.entity import Entity
+from data_layer.filter_factory import FilterFactory
+from data_layer.filters import Filter
+
+
+@dataclass
+class FilterCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+    max_size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class FilterCache:
+    """
+    A bounded LRU cache of filters created from dict representations.  Cached filters are frozen, so they are hashable,
+    immutable and carry a precompiled elasticsearch query.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        if max_size < 1:
+            raise ValueError("FilterCache max_size must be at least 1.")
+        self.max_size = max_size
+        self._filters: OrderedDict[tuple, Filter] = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def cache_key(filter_dict: dict[str, any], entity: Type[Entity]) -> tuple:
+        """
+        Create the cache key for a filter dict: the entity class and the canonical json of the filter dict.
+        """
+        return entity, json.dumps(filter_dict, sort_keys=True, default=str)
+
+    def filter_from_dict(self, filter_dict: dict[str, any], entity: Type[Entity]) -> Filter:
+        """
+        Create a filter from a dictionary, returning the cached filter if the same dict has been seen before.
+        :param filter_dict: the dictionary representation of a filter.
+        :param entity: the entity class.  Needed to validate the field.
+        :return: a frozen instance of a Filter.
+        """
+        key = self.cache_key(filter_dict=filter_dict, entity=entity)
+        with self._lock:
+            data_filter = self._filters.get(key)
+            if data_filter is not None:
+                self._filters.move_to_end(key)
+                self._hits += 1
+                return data_filter
+            self._misses += 1
+
+        data_filter = FilterFactory.filter_from_dict(filter_dict=filter_dict, entity=entity).freeze()
+
+        with self._lock:
+            self._filters[key] = data_filter
+            self._filters.move_to_end(key)
+            while len(self._filters) > self.max_size:
+                self._filters.popitem(last=False)
+                self._evictions += 1
+        return data_filter
+
+    def filters_from_dicts(self, filter_dicts: list[dict[str, any]], entity: Type[Entity]) -> list[Filter]:
+        """
+        Create a list of filters from a list of dictionaries.
+        """
+        return [self.filter_from_dict(filter_dict=f, entity=entity) for f in filter_dicts]
+
+    def stats(self) -> FilterCacheStats:
+        """
+        Get the hit, miss and eviction counts of the cache.
+        """
+        with self._lock:
+            return FilterCacheStats(hits=self._hits, misses=self._misses, evictions=self._evictions,
+                                    size=len(self._filters), max_size=self.max_size)
+
+    def clear(self):
+        """
+        Remove all filters from the cache and reset the statistics.
+        """
+        with self._lock:
+            self._filters.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    def __len__(self):
+        return len(self._filters)
@@ -16,6 +16,9 @@ class FilterFactory:
         Operator.EXISTS: ExistsFilter,
         Operator.DOES_NOT_EXIST: DoesNotExistFilter,
         Operator.OR: OrFilter,
+        Operator.AND: AndFilter,
+        Operator.NOT: NotFilter,
+        Operator.RANGE: RangeFilter,
     }
 
     @staticmethod
@@ -44,14 +47,25 @@ class FilterFactory:
 
         value = filter_dict.get("value")
 
+        if operator == Operator.RANGE:
+            if field and isinstance(value, dict):
+                value = {bound: parse(value_type=field.type, value=v) for bound, v in value.items()}
+            return filter_class.from_value(field=field, value=value)
+
         if field:
             value = parse(value_type=field.type, value=value)
 
-        if operator == Operator.OR:
+        if operator in [Operator.OR, Operator.AND]:
             filters = filter_dict.get("filters", [])
             filters = [FilterFactory.filter_from_dict(filter_dict=f, entity=entity) for f in filters]
             return filter_class(filters=filters)
 
+        if operator == Operator.NOT:
+            negated = filter_dict.get("filter")
+            if negated is not None:
+                negated = FilterFactory.filter_from_dict(filter_dict=negated, entity=entity)
+            return filter_class(filter=negated)
+
         if operator in [Operator.EXISTS, Operator.DOES_NOT_EXIST]:
             return filter_class(field=field)
 
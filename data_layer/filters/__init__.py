@@ -8,4 +8,6 @@ from data_layer.filters.less_than_filter import LessThanFilter
 from data_layer.filters.exists_filter import ExistsFilter
 from data_layer.filters.does_not_exist_filter import DoesNotExistFilter
 from data_layer.filters.or_filter import OrFilter
-
+from data_layer.filters.and_filter import AndFilter
+from data_layer.filters.not_filter import NotFilter
+from data_layer.filters.range_filter import RangeFilter
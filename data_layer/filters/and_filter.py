@@ -0,0 +1,57 @@
+from data_layer.entity import Entity
+from data_layer.filters.filter import Filter
+from data_layer.operator import Operator
+
+
+class AndFilter(Filter):
+
+    def __init__(self, filters: list[Filter]):
+        super().__init__(operator=Operator.AND, field=None, value=None)
+
+        if filters is None:
+            raise Exception("And filter missing filters.")
+        if not isinstance(filters, list):
+            raise Exception("And filter 'filters' must be a list.")
+        for f in filters:
+            if not isinstance(f, Filter):
+                raise Exception(f"Value {f} is not of type Filter")
+
+        self.filters = filters
+
+    @property
+    def children(self) -> list[Filter]:
+        return self.filters
+
+    def _freeze_children(self):
+        self.filters = tuple(self.filters)
+
+    def to_elasticsearch(self) -> dict:
+        """
+        Create bool elasticsearch filter
+        :return: dict bool filter
+        """
+        return {
+            "bool": {
+                "filter": [f.elasticsearch_query for f in self.filters]
+            }
+        }
+
+    def evaluate(self, entity: Entity) -> bool:
+        """
+        Evaluate a filter on a value.  Return True or False depending on the evaluation of the filter.
+        :return: True if the filter evaluates to True on the value and False otherwise.
+        """
+        return all(f.evaluate(entity) for f in self.filters)
+
+    def to_dict(self) -> dict:
+        """
+        Overwrite to_dict method to return a dictionary representation of the filter
+        :return: a dictionary representation of the filter
+        """
+        return {
+            "operator": self.operator.value,
+            "filters": [f.to_dict() for f in self.filters]
+        }
+
+    def __repr__(self):
+        return f"({' AND '.join([str(f) for f in self.filters])})"
@@ -1,9 +1,11 @@
+import json
 from abc import ABC, abstractmethod
 from dataclasses import Field
+from functools import cached_property
 
-from data_layer.entity import Entity, MetaData
+from data_layer.entity import Entity, MetaData, field_identity
 from data_layer.operator import Operator
-from data_layer.util import serialize
+from data_layer.util import serialize, freeze, FrozenDict
 
 
 class Filter(ABC):
@@ -15,6 +17,22 @@ class Filter(ABC):
         if field and not isinstance(field, Field):
             raise Exception("field must be a dataclass Field.")
 
+    def __setattr__(self, name, value):
+        if self.__dict__.get("_frozen"):
+            raise AttributeError(f"Cannot modify frozen filter {self}.")
+        super().__setattr__(name, value)
+
+    def __eq__(self, other):
+        # Frozen filters are values and compare by fingerprint; filters that can still change compare by identity.
+        if self.__dict__.get("_frozen") and isinstance(other, Filter) and other.__dict__.get("_frozen"):
+            return type(self) is type(other) and self.fingerprint == other.fingerprint
+        return super().__eq__(other)
+
+    def __hash__(self):
+        if self.__dict__.get("_frozen"):
+            return hash(self.fingerprint)
+        return super().__hash__()
+
     @abstractmethod
     def evaluate(self, entity: Entity) -> bool:
         pass
@@ -23,12 +41,69 @@ class Filter(ABC):
     def to_elasticsearch(self):
         pass
 
-    @property
+    @cached_property
     def field_metadata(self):
         if self.field:
             return MetaData(**self.field.metadata)
         return None
 
+    @property
+    def fingerprint(self) -> str:
+        """
+        A canonical string representation of the filter and the entity fields it applies to, suitable as a cache key.
+        """
+        if self.__dict__.get("_frozen"):
+            return self.__dict__["_fingerprint"]
+        return json.dumps({"fields": self._field_identities(), "filter": self.to_dict()}, sort_keys=True, default=str)
+
+    def _field_identities(self) -> list[str]:
+        """
+        The identities of the fields of the filter and its children, see field_identity.
+        """
+        identities = [field_identity(self.field)] if self.field else []
+        for child in self.children:
+            identities.extend(child._field_identities())
+        return identities
+
+    @property
+    def elasticsearch_query(self) -> dict:
+        """
+        The elasticsearch query for the filter.  Frozen filters return the query compiled when they were frozen.
+        """
+        if self.__dict__.get("_frozen"):
+            return self.__dict__["_es_query"]
+        return self.to_elasticsearch()
+
+    @property
+    def children(self) -> list["Filter"]:
+        """
+        The filters nested in this filter.
+        """
+        return []
+
+    def freeze(self) -> "Filter":
+        """
+        Make the filter immutable and precompile its fingerprint and elasticsearch query.  Lists in the filter become
+        tuples and dicts become read only mappings, so the filter can not be changed in place either.
+        :return: the frozen filter.
+        """
+        if self.__dict__.get("_frozen"):
+            return self
+        for child in self.children:
+            child.freeze()
+        self.value = freeze(self.value)
+        self._freeze_children()
+        self._fingerprint = self.fingerprint
+        self._es_query = freeze(self.to_elasticsearch(), mapping_type=FrozenDict)
+        self._frozen = True
+        return self
+
+    def _freeze_children(self):
+        """
+        Replace mutable containers of child filters with immutable ones.
+        """
+        pass
+
     def to_dict(self) -> dict:
         """
         Convert the filter to a dict.
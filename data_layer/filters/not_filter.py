@@ -0,0 +1,51 @@
+from data_layer.entity import Entity
+from data_layer.filters.filter import Filter
+from data_layer.operator import Operator
+
+
+class NotFilter(Filter):
+
+    def __init__(self, filter: Filter):
+        super().__init__(operator=Operator.NOT, field=None, value=None)
+
+        if filter is None:
+            raise Exception("Not filter missing filter.")
+        if not isinstance(filter, Filter):
+            raise Exception(f"Value {filter} is not of type Filter")
+
+        self.filter = filter
+
+    @property
+    def children(self) -> list[Filter]:
+        return [self.filter]
+
+    def to_elasticsearch(self) -> dict:
+        """
+        Create bool must_not elasticsearch filter
+        :return: dict bool filter
+        """
+        return {
+            "bool": {
+                "must_not": self.filter.elasticsearch_query
+            }
+        }
+
+    def evaluate(self, entity: Entity) -> bool:
+        """
+        Evaluate a filter on a value.  Return True or False depending on the evaluation of the filter.
+        :return: True if the filter evaluates to True on the value and False otherwise.
+        """
+        return not self.filter.evaluate(entity)
+
+    def to_dict(self) -> dict:
+        """
+        Overwrite to_dict method to return a dictionary representation of the filter
+        :return: a dictionary representation of the filter
+        """
+        return {
+            "operator": self.operator.value,
+            "filter": self.filter.to_dict()
+        }
+
+    def __repr__(self):
+        return f"NOT ({self.filter})"
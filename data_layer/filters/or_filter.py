@@ -18,6 +18,13 @@ class OrFilter(Filter):
 
         self.filters = filters
 
+    @property
+    def children(self) -> list[Filter]:
+        return self.filters
+
+    def _freeze_children(self):
+        self.filters = tuple(self.filters)
+
     def to_elasticsearch(self) -> dict:
         """
         Create term elasticsearch filter
@@ -25,7 +32,7 @@ class OrFilter(Filter):
         """
         return {
             "bool": {
-                "should": [f.to_elasticsearch() for f in self.filters]
+                "should": [f.elasticsearch_query for f in self.filters]
             }
         }
 
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from data_layer.entity import Entity
+from data_layer.filters.filter import Filter
+from data_layer.operator import Operator
+
+
+class RangeFilter(Filter):
+    bounds = {"gt": "greater than", "gte": "at least", "lt": "less than", "lte": "at most"}
+
+    def __init__(self, field, gt: any = None, gte: any = None, lt: any = None, lte: any = None):
+        value = {bound: v for bound, v in [("gt", gt), ("gte", gte), ("lt", lt), ("lte", lte)] if v is not None}
+        super().__init__(operator=Operator.RANGE, field=field, value=value)
+
+        if field is None:
+            raise Exception("Range filter missing field.")
+        if not value:
+            raise Exception("Range filter needs at least one bound.")
+        if gt is not None and gte is not None:
+            raise Exception("Range filter can not have both 'gt' and 'gte'.")
+        if lt is not None and lte is not None:
+            raise Exception("Range filter can not have both 'lt' and 'lte'.")
+        if field.type not in [int, float, datetime]:
+            raise Exception(f"Field {field.name} is not a numeric field")
+        for val in value.values():
+            if not isinstance(val, field.type):
+                raise Exception(f"Value {val} is not of type {field.type}")
+
+    @classmethod
+    def from_value(cls, field, value: dict) -> "RangeFilter":
+        """
+        Create a range filter from a dict of bounds, e.g. {"gte": 1, "lt": 5}.
+        """
+        if field is None:
+            raise Exception("Range filter missing field.")
+        if not isinstance(value, dict):
+            raise Exception("Range filter 'value' must be a dict of bounds.")
+        unknown = set(value) - set(cls.bounds)
+        if unknown:
+            raise Exception(f"Range filter has unknown bounds {sorted(unknown)}.")
+        return cls(field=field, **value)
+
+    def to_elasticsearch(self) -> dict:
+        """
+        Create range elasticsearch filter
+        :return: dict range filter
+        """
+        field_name = self.field_metadata.es_field_name or self.field.name
+        return {
+            "range": {
+                field_name: dict(self.value)
+            }
+        }
+
+    def evaluate(self, entity: Entity) -> bool:
+        """
+        Evaluate a filter on a value.  Return True or False depending on the evaluation of the filter.
+        :return: True if the filter evaluates to True on the value and False otherwise.
+        """
+        value = getattr(entity, self.field.name, None)
+        if value is None:
+            return False
+        if "gt" in self.value and not value > self.value["gt"]:
+            return False
+        if "gte" in self.value and not value >= self.value["gte"]:
+            return False
+        if "lt" in self.value and not value < self.value["lt"]:
+            return False
+        if "lte" in self.value and not value <= self.value["lte"]:
+            return False
+        return True
+
+    def __repr__(self):
+        return f"{self.field.name} is {' and '.join([f'{self.bounds[b]} {v}' for b, v in self.value.items()])}"
@@ -0,0 +1,118 @@
+import math
+import os
+import sys
+from enum import Enum
+from itertools import repeat
+from typing import Type, TYPE_CHECKING
+
+from data_layer.entity import Entity
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+class ExecutorType(str, Enum):
+    PROCESS = 'process'
+    THREAD = 'thread'
+
+
+def gil_enabled() -> bool:
+    """
+    Whether the interpreter runs with the GIL.  Free-threaded builds can hydrate in parallel with threads.
+    """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled() if is_gil_enabled else True
+
+
+def _hydrate_chunk(entity: Type[Entity], sources: list[dict]) -> list[Entity]:
+    return [entity.from_es(data=source) for source in sources]
+
+
+class Hydrator:
+    """
+    Converts elasticsearch sources to entities, splitting large result sets into chunks that are hydrated in parallel.
+    Uses a process pool, or a thread pool on free-threaded Python.  Results smaller than min_parallel are hydrated
+    inline, because sending them to workers costs more than it saves.  The default min_parallel is the page size of
+    ElasticStore scans, so full scan pages and large reads are hydrated in parallel.
+
+    With a process pool, entity classes must be importable by the worker processes (defined at module level).
+    """
+
+    def __init__(self, max_workers: int = None, chunk_size: int = None, min_parallel: int = 1000,
+                 executor_type: ExecutorType = None):
+        """
+        :param max_workers: the number of workers, by default the number of CPUs.
+        :param chunk_size: the number of sources sent to a worker at once, by default the sources are split evenly
+            across the workers.  Larger chunks amortize the pickling.
+        :param min_parallel: results with fewer sources are hydrated inline.
+        :param executor_type: process or thread, by default threads if the GIL is disabled and processes otherwise.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.min_parallel = min_parallel
+        if executor_type is None:
+            executor_type = ExecutorType.PROCESS if gil_enabled() else ExecutorType.THREAD
+        self.executor_type = ExecutorType(executor_type)
+        self._executor: "Executor | None" = None
+        self._picklable: dict[type, bool] = {}
+
+    def hydrate(self, entity: Type[Entity], sources: list[dict]) -> list[Entity]:
+        """
+        Convert elasticsearch sources to entities, preserving their order.
+        :param entity: the entity class.
+        :param sources: the _source dicts of the hits.
+        :return: a list of entities.
+        """
+        if len(sources) < max(self.min_parallel, 1) or self.max_workers < 2:
+            return _hydrate_chunk(entity=entity, sources=sources)
+        if self.executor_type == ExecutorType.PROCESS and not self._can_send(entity=entity):
+            return _hydrate_chunk(entity=entity, sources=sources)
+        chunk_size = self.chunk_size or math.ceil(len(sources) / self.max_workers)
+        chunks = [sources[i:i + chunk_size] for i in range(0, len(sources), chunk_size)]
+        results = self._get_executor().map(_hydrate_chunk, repeat(entity), chunks)
+        return [e for chunk in results for e in chunk]
+
+    def _can_send(self, entity: Type[Entity]) -> bool:
+        """
+        Whether the entity class can be pickled for worker processes, i.e. it is defined at module level.
+        """
+        if entity not in self._picklable:
+            import pickle
+            try:
+                pickle.dumps(entity)
+                self._picklable[entity] = True
+            except (pickle.PicklingError, AttributeError, TypeError):
+                self._picklable[entity] = False
+        return self._picklable[entity]
+
+    def _get_executor(self) -> "Executor":
+        # The pools, like pickle in _can_send, are imported when first used; multiprocessing is slow to import and most
+        # processes never hydrate in parallel.
+        if self._executor is None:
+            if self.executor_type == ExecutorType.PROCESS:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                # Forking a process that runs client and worker threads can deadlock the children, so workers are
+                # started from a fork server, or spawned where that is not available.
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def shutdown(self):
+        """
+        Stop the workers.  They are started again on the next parallel hydration.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
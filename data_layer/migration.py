@@ -0,0 +1,152 @@
+import json
+import os
+import time
+from dataclasses import dataclass
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from typing import Callable
+
+from data_layer.entity import Entity
+from data_layer.filters import Filter
+from data_layer.stores.store import Page, Store
+
+
+@dataclass
+class CopyProgress:
+    copied: int = 0
+    pages: int = 0
+    elapsed: float = 0.0
+    cursor: any = None
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.copied / self.elapsed if self.elapsed else 0.0
+
+
+def copy_store(src: Store, dst: Store, filters: list[Filter] = None, workers: int = 4, page_size: int = 1000,
+               queue_size: int = None, checkpoint: str = None, transform: Callable[[Entity], Entity] = None,
+               on_progress: Callable[[CopyProgress], None] = None) -> CopyProgress:
+    """
+    Copy the entities matching the filters from one store to another.  Pages are read from the source by a producer
+    thread into a bounded queue and written to the destination in bulk by worker threads.
+
+    Entities are decoded by the source store and encoded by the destination store, so stores with different field
+    mappings (e.g. es_field_name) can be copied between.  If the stores have different entity classes, entities are
+    converted with to_dict and from_dict unless a transform is given.
+
+    :param src: the store to copy from.
+    :param dst: the store to copy to.
+    :param filters: only copy entities matching the filters.
+    :param workers: the number of writer threads.
+    :param page_size: the number of entities per page and per bulk write.
+    :param queue_size: the maximum number of pages waiting to be written, by default twice the number of workers.
+    :param checkpoint: path of a json file recording progress.  If the file exists, the copy resumes from it.  It is
+        removed when the copy completes.
+    :param transform: optional function applied to each entity before it is written.
+    :param on_progress: optional callback, called after each page is written.
+    :return: the final progress.
+    """
+    if workers < 1:
+        raise ValueError("copy_store needs at least one worker.")
+    if transform is None and src.entity is not dst.entity:
+        def transform(entity: Entity) -> Entity:
+            return dst.entity.from_dict(data=entity.to_dict())
+
+    progress = CopyProgress()
+    if checkpoint and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            state = json.load(f)
+        progress.copied, progress.pages, progress.cursor = state["copied"], state["pages"], state["cursor"]
+
+    pages: Queue = Queue(maxsize=queue_size or workers * 2)
+    stop = Event()
+    lock = Lock()
+    errors = []
+    completed: dict[int, tuple[int, any]] = {}
+    next_sequence = 0
+    scanned_pages = None
+    start = time.perf_counter()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        nonlocal scanned_pages
+        try:
+            sequence = 0
+            for page in src.scan(filters=filters or [], page_size=page_size, after=progress.cursor):
+                if not put((sequence, page)):
+                    return
+                sequence += 1
+            scanned_pages = sequence
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(workers):
+                put(None)
+
+    def complete(sequence: int, page: Page):
+        # Pages can finish out of order; the checkpoint only advances past pages that are all written.
+        nonlocal next_sequence
+        with lock:
+            completed[sequence] = (len(page.items), page.cursor)
+            while next_sequence in completed:
+                count, cursor = completed.pop(next_sequence)
+                next_sequence += 1
+                progress.copied += count
+                progress.pages += 1
+                progress.cursor = cursor
+            progress.elapsed = time.perf_counter() - start
+            if checkpoint:
+                _write_checkpoint(path=checkpoint, progress=progress)
+            if on_progress:
+                on_progress(progress)
+
+    def consume():
+        while not stop.is_set():
+            try:
+                item = pages.get(timeout=0.1)
+            except Empty:
+                continue
+            if item is None:
+                return
+            sequence, page = item
+            try:
+                items = page.items if transform is None else [(key, transform(e)) for key, e in page.items]
+                dst.create_many(items=items, refresh=False)
+                complete(sequence=sequence, page=page)
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+                return
+
+    threads = [Thread(target=produce, daemon=True)] + [Thread(target=consume, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    if scanned_pages is None or next_sequence != scanned_pages:
+        raise RuntimeError(f"Copy stopped after {next_sequence} pages; resume it from the checkpoint.")
+
+    dst.refresh()
+    progress.elapsed = time.perf_counter() - start
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return progress
+
+
+def _write_checkpoint(path: str, progress: CopyProgress):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"copied": progress.copied, "pages": progress.pages, "cursor": progress.cursor}, f)
+    os.replace(temp_path, path)
@@ -11,3 +11,6 @@ class Operator(str, Enum):
     EXISTS = 'exists'
     DOES_NOT_EXIST = 'does_not_exist'
     OR = 'or'
+    AND = 'and'
+    NOT = 'not'
+    RANGE = 'range'
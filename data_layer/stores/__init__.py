@@ -1,2 +1,41 @@
+from data_layer.stores.store import Page, Store
+from data_layer.stores.change_event import ChangeEvent, ChangeType
+from data_layer.stores.live_view import LiveView
 from data_layer.stores.dict_store import DictStore
-from data_layer.stores.elastic_store import ElasticStore
+from data_layer.stores.coalescing_store import CoalescingStore, CoalescingStats
+from data_layer.stores.membership_store import MembershipStore, MembershipStats
+
+# Backends with optional dependencies are imported on first access, so that using DictStore does not require (or pay
+# the import cost of) their client libraries.
+_lazy_stores = {
+    "ElasticStore": ("data_layer.stores.elastic_store", "elasticsearch"),
+    "PartitionedElasticStore": ("data_layer.stores.partitioned_elastic_store", "elasticsearch"),
+    "PartitionInterval": ("data_layer.stores.partitioned_elastic_store", "elasticsearch"),
+}
+
+
+def _available_lazy_stores() -> list[str]:
+    """
+    The lazy names whose dependencies are installed.  Only these are star exported, so that star imports work without
+    the optional dependencies.
+    """
+    from importlib.util import find_spec
+    return [name for name, (_, dependency) in _lazy_stores.items() if find_spec(dependency) is not None]
+
+
+__all__ = ["Page", "Store", "ChangeEvent", "ChangeType", "LiveView", "DictStore", "CoalescingStore", "CoalescingStats",
+           "MembershipStore", "MembershipStats", *_available_lazy_stores()]
+
+
+def __getattr__(name):
+    if name not in _lazy_stores:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, _ = _lazy_stores[name]
+    import importlib
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
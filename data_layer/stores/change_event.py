@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from enum import Enum
+
+from data_layer.entity import Entity
+
+
+class ChangeType(str, Enum):
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    change_type: ChangeType
+    key: str
+    entity: Entity
@@ -0,0 +1,162 @@
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Iterator
+
+from data_layer.entity import Entity
+from data_layer.filters import Filter
+from data_layer.stores.store import Page, Store
+
+
+@dataclass
+class CoalescingStats:
+    calls: int = 0
+    backend_calls: int = 0
+
+    @property
+    def deduplicated(self) -> int:
+        return self.calls - self.backend_calls
+
+
+class CoalescingStore(Store):
+    """
+    Wraps a store so that concurrent identical get and read calls share a single call to the wrapped store.  Get calls
+    are identified by key and read calls by the fingerprints of their filters.  Writes are passed through and stop
+    later callers from joining calls that were started before the write.
+
+    Callers that share a call receive the same entity instances.
+    """
+
+    def __init__(self, store: Store, executor: Executor = None):
+        super().__init__(entity=store.entity)
+        self.store = store
+        self.executor = executor
+        self._lock = Lock()
+        self._in_flight: dict[tuple, Future] = {}
+        self._calls = 0
+        self._backend_calls = 0
+
+    def get(self, key: str) -> Entity:
+        return self._run(call_key=("get", key), call=lambda: self.store.get(key=key))
+
+    def read(self, filters: list[Filter]) -> list[Entity]:
+        return list(self._run(call_key=self._read_key(filters), call=lambda: self.store.read(filters=filters)))
+
+    def read_many(self, filter_sets: list[list[Filter]]) -> list[list[Entity]]:
+        return self.store.read_many(filter_sets=filter_sets)
+
+    async def aget(self, key: str) -> Entity:
+        """
+        Asyncio version of get.  The wrapped store is called in the executor.
+        """
+        return await self._arun(call_key=("get", key), call=lambda: self.store.get(key=key))
+
+    async def aread(self, filters: list[Filter]) -> list[Entity]:
+        """
+        Asyncio version of read.  The wrapped store is called in the executor.
+        """
+        return list(await self._arun(call_key=self._read_key(filters), call=lambda: self.store.read(filters=filters)))
+
+    def create(self, entity: Entity, key: str):
+        self.store.create(entity=entity, key=key)
+        self._invalidate(key=key)
+
+    def update(self, entity: Entity, key: str, partial: bool = False):
+        # Stores written before partial updates take no partial argument, so partial updates are sent to patch.
+        if partial:
+            self.store.patch(key=key, entity=entity)
+        else:
+            self.store.update(entity=entity, key=key)
+        self._invalidate(key=key)
+
+    def patch(self, key: str, entity: Entity, upsert: bool = False):
+        self.store.patch(key=key, entity=entity, upsert=upsert)
+        self._invalidate(key=key)
+
+    def delete(self, key: str):
+        self.store.delete(key=key)
+        self._invalidate(key=key)
+
+    def create_many(self, items: list[tuple[str, Entity]], refresh: bool = True):
+        self.store.create_many(items=items, refresh=refresh)
+        for key, _ in items:
+            self._invalidate(key=key)
+
+    def refresh(self):
+        self.store.refresh()
+
+    def scan(self, filters: list[Filter], page_size: int = 1000, after: any = None) -> Iterator[Page]:
+        return self.store.scan(filters=filters, page_size=page_size, after=after)
+
+    def scan_keys(self, filters: list[Filter], page_size: int = 1000) -> Iterator[list[str]]:
+        return self.store.scan_keys(filters=filters, page_size=page_size)
+
+    def explain(self, filters: list[Filter]) -> dict:
+        return self.store.explain(filters=filters)
+
+    def profile(self, filters: list[Filter]) -> dict:
+        return self.store.profile(filters=filters)
+
+    def stats(self) -> CoalescingStats:
+        """
+        Get the number of calls made to this store and the number of calls that reached the wrapped store.
+        """
+        with self._lock:
+            return CoalescingStats(calls=self._calls, backend_calls=self._backend_calls)
+
+    @staticmethod
+    def _read_key(filters: list[Filter]) -> tuple:
+        return "read", tuple(f.fingerprint for f in filters)
+
+    def _join(self, call_key: tuple) -> tuple[Future, bool]:
+        """
+        Join the in flight call for the key, or register a new one.
+        :return: the future of the call and whether the caller has to make the call.
+        """
+        with self._lock:
+            self._calls += 1
+            future = self._in_flight.get(call_key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._in_flight[call_key] = future
+            self._backend_calls += 1
+            return future, True
+
+    def _execute(self, call_key: tuple, future: Future, call: Callable):
+        try:
+            result = call()
+        except BaseException as e:
+            self._release(call_key=call_key, future=future)
+            future.set_exception(e)
+        else:
+            self._release(call_key=call_key, future=future)
+            future.set_result(result)
+
+    def _release(self, call_key: tuple, future: Future):
+        with self._lock:
+            if self._in_flight.get(call_key) is future:
+                del self._in_flight[call_key]
+
+    def _invalidate(self, key: str):
+        with self._lock:
+            for call_key in list(self._in_flight):
+                if call_key == ("get", key) or call_key[0] == "read":
+                    del self._in_flight[call_key]
+
+    def _run(self, call_key: tuple, call: Callable):
+        future, leader = self._join(call_key=call_key)
+        if leader:
+            self._execute(call_key=call_key, future=future, call=call)
+        return future.result()
+
+    async def _arun(self, call_key: tuple, call: Callable):
+        # Imported here so that synchronous users do not pay the asyncio import at startup.
+        import asyncio
+
+        future, leader = self._join(call_key=call_key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            loop.run_in_executor(self.executor, self._execute, call_key, future, call)
+        # Shield the shared future so a cancelled caller does not cancel the call for the others.
+        return await asyncio.shield(asyncio.wrap_future(future))
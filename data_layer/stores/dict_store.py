@@ -1,9 +1,13 @@
-from typing import Type
+import time
+from dataclasses import Field
+from typing import Callable, Iterator, Type
 
 from data_layer.entity import Entity
 from data_layer.exceptions import EntityNotFoundError
 from data_layer.filters import Filter
-from data_layer.stores.store import Store
+from data_layer.stores.change_event import ChangeEvent, ChangeType
+from data_layer.stores.live_view import LiveView
+from data_layer.stores.store import Page, Store
 
 
 class DictStore(Store):
@@ -11,6 +15,8 @@ class DictStore(Store):
     def __init__(self, entity: Type[Entity]):
         super().__init__(entity)
         self.data = {}
+        self._subscribers: list[Callable[[ChangeEvent], None]] = []
+        self._views: list[LiveView] = []
 
     def get(self, key: str) -> Entity:
         try:
@@ -20,12 +26,135 @@ class DictStore(Store):
 
     def create(self, entity: Entity, key: str):
         self.data[key] = entity
+        entity.mark_clean()
+        self._emit(ChangeEvent(change_type=ChangeType.CREATE, key=key, entity=entity))
 
-    def update(self, entity: Entity, key: str):
+    def update(self, entity: Entity, key: str, partial: bool = False):
+        if partial:
+            return self.patch(key=key, entity=entity)
         self.data[key] = entity
+        entity.mark_clean()
+        self._emit(ChangeEvent(change_type=ChangeType.UPDATE, key=key, entity=entity))
+
+    def patch(self, key: str, entity: Entity, upsert: bool = False):
+        stored = self.data.get(key)
+        if stored is None:
+            if not upsert:
+                raise EntityNotFoundError.for_key(key=key)
+            return self.create(entity=entity, key=key)
+        for name in entity.dirty_fields():
+            setattr(stored, name, getattr(entity, name))
+        stored.mark_clean()
+        entity.mark_clean()
+        self._emit(ChangeEvent(change_type=ChangeType.UPDATE, key=key, entity=stored))
 
     def delete(self, key: str):
-        del self.data[key]
+        entity = self.data.pop(key)
+        self._emit(ChangeEvent(change_type=ChangeType.DELETE, key=key, entity=entity))
 
     def read(self, filters: list[Filter]) -> list[Entity]:
-        return [entity for entity in self.data.values() if all([f.evaluate(entity) for f in filters])]
+        return [entity for entity in self.data.values() if all(f.evaluate(entity) for f in filters)]
+
+    def read_many(self, filter_sets: list[list[Filter]]) -> list[list[Entity]]:
+        """
+        Execute all reads in a single scan of the entities.
+        """
+        results = [[] for _ in filter_sets]
+        for entity in self.data.values():
+            for result, filters in zip(results, filter_sets):
+                if all(f.evaluate(entity) for f in filters):
+                    result.append(entity)
+        return results
+
+    def scan(self, filters: list[Filter], page_size: int = 1000, after: str = None) -> Iterator[Page]:
+        """
+        Scan the entities in key order.  The cursor of a page is its last key.
+        """
+        keys = sorted(key for key in self.data if after is None or key > after)
+        items = []
+        for key in keys:
+            entity = self.data.get(key)
+            if entity is None or not all(f.evaluate(entity) for f in filters):
+                continue
+            items.append((key, entity))
+            if len(items) == page_size:
+                yield Page(items=items, cursor=key)
+                items = []
+        if items:
+            yield Page(items=items, cursor=items[-1][0])
+
+    def explain(self, filters: list[Filter]) -> dict:
+        """
+        DictStore has no indexes, so a read is a full scan that evaluates the filters in order on each entity and stops
+        at the first filter that does not match.
+        """
+        return {
+            "store": self.__class__.__name__,
+            "scan": "full",
+            "index": None,
+            "entities": len(self.data),
+            "plan": [{"filter": str(f), "definition": f.to_dict()} for f in filters]
+        }
+
+    def profile(self, filters: list[Filter]) -> dict:
+        """
+        Execute a read and count the evaluations, matches and time spent in each filter.
+        """
+        evaluations = [0] * len(filters)
+        matches = [0] * len(filters)
+        timings = [0] * len(filters)
+        hits = 0
+        start = time.perf_counter_ns()
+        for entity in self.data.values():
+            for i, f in enumerate(filters):
+                filter_start = time.perf_counter_ns()
+                match = f.evaluate(entity)
+                timings[i] += time.perf_counter_ns() - filter_start
+                evaluations[i] += 1
+                if not match:
+                    break
+                matches[i] += 1
+            else:
+                hits += 1
+        total = time.perf_counter_ns() - start
+        return {
+            **self.explain(filters=filters),
+            "hits": hits,
+            "total_ms": total / 1e6,
+            "filters": [{"filter": str(f), "evaluations": evaluations[i], "matches": matches[i],
+                         "time_ms": timings[i] / 1e6} for i, f in enumerate(filters)]
+        }
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None]):
+        """
+        Register a callback that receives a ChangeEvent for every create, update and delete.
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[ChangeEvent], None]):
+        self._subscribers.remove(callback)
+
+    def create_view(self, filters: list[Filter], sort_field: Field = None, top_k: int = None,
+                    descending: bool = True) -> LiveView:
+        """
+        Register a live view: the result set of the filters, maintained incrementally as the store changes.
+        :param filters: the filters of the view.
+        :param sort_field: optional field to rank the matching entities by.
+        :param top_k: optional number of entities returned by LiveView.top.
+        :param descending: rank the highest values first.
+        :return: the live view, populated with the entities currently in the store.
+        """
+        view = LiveView(filters=filters, sort_field=sort_field, top_k=top_k, descending=descending)
+        for key, entity in self.data.items():
+            view.apply(ChangeEvent(change_type=ChangeType.CREATE, key=key, entity=entity))
+        self._views.append(view)
+        return view
+
+    def drop_view(self, view: LiveView):
+        self._views.remove(view)
+
+    def _emit(self, event: ChangeEvent):
+        for view in self._views:
+            view.apply(event)
+        for callback in self._subscribers:
+            callback(event)
@@ -1,18 +1,63 @@
-from typing import Type
+import time
+from typing import Iterator, Type
 
-from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch import Elasticsearch, NotFoundError, helpers
 
-from data_layer.entity import Entity
-from data_layer.exceptions import EntityNotFoundError
+from data_layer.entity import Entity, MetaData
+from data_layer.exceptions import EntityNotFoundError, ReadError, CursorExpiredError
 from data_layer.filters import Filter
-from data_layer.stores.store import Store
+from data_layer.hydration import Hydrator
+from data_layer.stores.es_mapping import build_mapping, mapping_diff
+from data_layer.stores.store import Page, Store
 
 
 class ElasticStore(Store):
-    def __init__(self, entity: Type[Entity], client: Elasticsearch, index: str):
+    def __init__(self, entity: Type[Entity], client: Elasticsearch, index: str, index_sort_field: str = None,
+                 hydrator: Hydrator = None, key_field: str = None, read_size: int = 10_000):
+        """
+        :param read_size: the maximum number of entities returned by a read, at most the index's max_result_window
+            (10000 by default).  Use scan to read more.
+        :param key_field: optional name of an entity field that holds the document key.  Scans are sorted by it, which
+            makes their cursors resumable at any time.
+        """
         super().__init__(entity=entity)
         self.client = client
         self.index = index
+        self.index_sort_field = index_sort_field
+        self.hydrator = hydrator
+        if key_field is not None and not hasattr(entity, key_field):
+            raise ValueError(f"Entity {entity.__name__} does not have field {key_field}")
+        self.key_field = key_field
+        self.read_size = read_size
+
+    def mapping(self) -> dict:
+        """
+        The index settings and mappings derived from the entity.
+        """
+        return build_mapping(entity=self.entity, index_sort_field=self.index_sort_field)
+
+    def ensure_index(self) -> bool:
+        """
+        Create the index with the mapping derived from the entity if it does not exist.
+        :return: True if the index was created.
+        """
+        if self.client.indices.exists(index=self.index):
+            return False
+        self.client.indices.create(index=self.index, **self.mapping())
+        return True
+
+    def mapping_diff(self) -> list[str]:
+        """
+        Compare the mapping of the index to the mapping derived from the entity.
+        :return: a list of differences, empty if the index matches the entity.
+        """
+        expected = self.mapping()["mappings"]["properties"]
+        response = self.client.indices.get_mapping(index=self._search_index(filters=[]))
+        differences = []
+        for index, index_mapping in response.items():
+            actual = index_mapping["mappings"].get("properties", {})
+            differences.extend(f"{index}: {d}" for d in mapping_diff(expected=expected, actual=actual))
+        return differences
 
     def get(self, key: str) -> Entity:
         try:
@@ -22,22 +67,246 @@ class ElasticStore(Store):
         return self.entity.from_es(data=doc['_source'])
 
     def create(self, entity: Entity, key: str):
-        self.client.index(index=self.index, id=key, body=entity.to_es(), refresh=True)
+        self.client.index(index=self._write_index(entity=entity), id=key, body=entity.to_es(), refresh=True)
+        entity.mark_clean()
+
+    def update(self, entity: Entity, key: str, partial: bool = False):
+        if partial:
+            return self.patch(key=key, entity=entity)
+        self.client.index(index=self._write_index(entity=entity), id=key, body=entity.to_es(), refresh=True)
+        entity.mark_clean()
+
+    def patch(self, key: str, entity: Entity, upsert: bool = False):
+        """
+        Send only the modified fields with the _update API, so the cluster merges them into the stored document.
+        """
+        self._patch(index=self._write_index(entity=entity), key=key, entity=entity, upsert=upsert)
+
+    def _patch(self, index: str, key: str, entity: Entity, upsert: bool):
+        body = {"doc": entity.to_es(field_names=entity.dirty_fields())}
+        if upsert:
+            body["upsert"] = entity.to_es()
+        try:
+            self.client.update(index=index, id=key, refresh=True, **body)
+        except NotFoundError:
+            raise EntityNotFoundError.for_key(key=key)
+        entity.mark_clean()
+
+    def create_many(self, items: list[tuple[str, Entity]], refresh: bool = True):
+        """
+        Create multiple entities with a single bulk request.
+        """
+        actions = [{"_index": self._write_index(entity=entity), "_id": key, "_source": entity.to_es()}
+                   for key, entity in items]
+        helpers.bulk(self.client, actions, refresh=refresh)
+        for _, entity in items:
+            entity.mark_clean()
+
+    def refresh(self):
+        self.client.indices.refresh(index=self._search_index(filters=[]))
+
+    def scan(self, filters: list[Filter], page_size: int = 1000, after: dict = None,
+             keep_alive: str = "10m") -> Iterator[Page]:
+        """
+        Scan the entities with search_after.
+
+        If the store has a key_field, the scan is sorted by it and its cursor can be resumed at any time.  Otherwise the
+        scan runs over a point in time, so it sees a consistent snapshot of the index, but its cursor can only be
+        resumed while the point in time is alive, i.e. within keep_alive of the last page.  Resuming after that raises
+        CursorExpiredError.
+        """
+        for hits, cursor in self._scan_hits(filters=filters, page_size=page_size, after=after, keep_alive=keep_alive):
+            entities = self._hydrate(hits=hits)
+            yield Page(items=[(hit['_id'], entity) for hit, entity in zip(hits, entities)], cursor=cursor)
+
+    def scan_keys(self, filters: list[Filter], page_size: int = 1000) -> Iterator[list[str]]:
+        """
+        Scan the keys of the matching documents without fetching their sources.
+        """
+        for hits, _ in self._scan_hits(filters=filters, page_size=page_size, source=False):
+            yield [hit['_id'] for hit in hits]
+
+    def _scan_hits(self, filters: list[Filter], page_size: int, after: dict = None, keep_alive: str = "10m",
+                   source: bool = True) -> Iterator[tuple[list[dict], dict]]:
+        """
+        Page through the raw hits of a scan, with the cursor after each page.
+        """
+        index = self._search_index(filters=filters)
+        if index is None:
+            return
+        search_after = after['search_after'] if after else None
+        pit_id = None
+        if self.key_field is None:
+            pit_id = after['pit'] if after else self.client.open_point_in_time(index=index, keep_alive=keep_alive,
+                                                                               **self._search_options())['id']
+
+        try:
+            while True:
+                body = self._query(filters=filters, size=page_size)
+                if not source:
+                    body["_source"] = False
+                if search_after is not None:
+                    body["search_after"] = search_after
+                if pit_id is None:
+                    body["sort"] = [{self._key_sort_field(): "asc"}]
+                    results = self.client.search(index=index, body=body, **self._search_options())
+                else:
+                    body.update({"pit": {"id": pit_id, "keep_alive": keep_alive}, "sort": [{"_shard_doc": "asc"}]})
+                    try:
+                        results = self.client.search(body=body)
+                    except NotFoundError:
+                        if after is None:
+                            raise
+                        pit_id = None
+                        raise CursorExpiredError.for_cursor(cursor=after)
+                    pit_id = results.get('pit_id', pit_id)
 
-    def update(self, entity: Entity, key: str):
-        self.client.index(index=self.index, id=key, body=entity.to_es(), refresh=True)
+                hits = results['hits']['hits']
+                if hits:
+                    search_after = hits[-1]['sort']
+                    cursor = {"search_after": search_after}
+                    if pit_id is not None:
+                        cursor["pit"] = pit_id
+                    yield hits, cursor
+                if len(hits) < page_size:
+                    break
+        finally:
+            if pit_id is not None:
+                try:
+                    self.client.close_point_in_time(id=pit_id)
+                except NotFoundError:
+                    pass
 
     def delete(self, key: str):
         self.client.delete(index=self.index, id=key, refresh=True)
 
     def read(self, filters: list[Filter]) -> list[Entity]:
-        es_query = {
+        index = self._search_index(filters=filters)
+        if index is None:
+            return []
+        results = self.client.search(index=index, body=self._query(filters=filters, size=self.read_size),
+                                     **self._search_options())
+        return self._hydrate(hits=results['hits']['hits'])
+
+    def read_many(self, filter_sets: list[list[Filter]]) -> list[list[Entity]]:
+        """
+        Execute all reads in a single _msearch request.  The target index of each read is resolved locally, so the
+        _msearch is the only request sent to the cluster.
+        """
+        results = [[] for _ in filter_sets]
+        searches = []
+        positions = []
+        for i, filters in enumerate(filter_sets):
+            index = self._search_index(filters=filters)
+            if index is None:
+                continue
+            searches.extend([{"index": index, **self._search_options()},
+                             self._query(filters=filters, size=self.read_size)])
+            positions.append((i, index))
+        if not searches:
+            return results
+
+        response = self.client.msearch(searches=searches)
+        for (i, index), item in zip(positions, response['responses']):
+            if 'error' in item:
+                raise ReadError.for_query(index=index, error=item['error'])
+            results[i] = self._hydrate(hits=item['hits']['hits'])
+        return results
+
+    def explain(self, filters: list[Filter]) -> dict:
+        """
+        Get the elasticsearch query a read with the filters sends to the cluster.
+        """
+        return {
+            "store": self.__class__.__name__,
+            "index": self._search_index(filters=filters),
+            "query": self._query(filters=filters, size=self.read_size)
+        }
+
+    def profile(self, filters: list[Filter]) -> dict:
+        """
+        Execute a read with elasticsearch profiling enabled.  Reports the time spent in each query clause per shard,
+        the time spent outside the cluster (transport and serialization) and the time spent hydrating entities.
+        """
+        index = self._search_index(filters=filters)
+        if index is None:
+            return {**self.explain(filters=filters), "hits": 0, "clauses": []}
+        es_query = self._query(filters=filters, size=self.read_size)
+        es_query["profile"] = True
+        start = time.perf_counter_ns()
+        results = self.client.search(index=index, body=es_query, **self._search_options())
+        request_ms = (time.perf_counter_ns() - start) / 1e6
+
+        start = time.perf_counter_ns()
+        hits = self._hydrate(hits=results['hits']['hits'])
+        hydration_ms = (time.perf_counter_ns() - start) / 1e6
+
+        clauses = []
+        for shard in results.get('profile', {}).get('shards', []):
+            for search in shard.get('searches', []):
+                for query in search.get('query', []):
+                    self._profile_clauses(shard_id=shard['id'], query=query, depth=0, clauses=clauses)
+
+        return {
+            **self.explain(filters=filters),
+            "hits": len(hits),
+            "took_ms": results['took'],
+            "request_ms": request_ms,
+            "transport_ms": max(request_ms - results['took'], 0),
+            "hydration_ms": hydration_ms,
+            "clauses": clauses
+        }
+
+    @staticmethod
+    def _profile_clauses(shard_id: str, query: dict, depth: int, clauses: list[dict]):
+        clauses.append({
+            "shard": shard_id,
+            "depth": depth,
+            "type": query['type'],
+            "description": query['description'],
+            "time_ms": query['time_in_nanos'] / 1e6
+        })
+        for child in query.get('children', []):
+            ElasticStore._profile_clauses(shard_id=shard_id, query=child, depth=depth + 1, clauses=clauses)
+
+    def _hydrate(self, hits: list[dict]) -> list[Entity]:
+        """
+        Convert search hits to entities, in parallel if the store has a hydrator.
+        """
+        sources = [hit['_source'] for hit in hits]
+        if self.hydrator is None:
+            return [self.entity.from_es(data=source) for source in sources]
+        return self.hydrator.hydrate(entity=self.entity, sources=sources)
+
+    def _key_sort_field(self) -> str:
+        metadata = MetaData(**getattr(self.entity, self.key_field).metadata)
+        return metadata.es_keyword_field or metadata.es_field_name or self.key_field
+
+    def _write_index(self, entity: Entity) -> str:
+        """
+        The index an entity is written to.
+        """
+        return self.index
+
+    def _search_index(self, filters: list[Filter]) -> str | None:
+        """
+        The index a read with the filters is sent to, or None if no index can contain a match.
+        """
+        return self.index
+
+    def _search_options(self) -> dict:
+        """
+        Extra options for searches of the index returned by _search_index.
+        """
+        return {}
+
+    @staticmethod
+    def _query(filters: list[Filter], size: int) -> dict:
+        return {
             "query": {
                 "bool": {
-                    "filter": [f.to_elasticsearch() for f in filters]
+                    "filter": [f.elasticsearch_query for f in filters]
                 }
-            }
+            },
+            "size": size
         }
-        results = self.client.search(index=self.index, body=es_query)
-        hits = results['hits']['hits']
-        return [self.entity.from_dict(data=hit['_source']) for hit in hits]
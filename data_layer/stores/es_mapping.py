@@ -0,0 +1,124 @@
+import types
+import typing
+from dataclasses import fields
+from datetime import datetime, date
+from typing import Type
+
+from data_layer.entity import Entity, MetaData
+
+_ES_TYPES = {
+    str: "keyword",
+    int: "long",
+    float: "double",
+    bool: "boolean",
+    datetime: "date",
+    date: "date",
+}
+
+_SORTABLE_TYPES = {"long", "double", "date"}
+
+_COMPARED_KEYS = ["type", "index", "doc_values", "fields"]
+
+# The values elasticsearch uses for keys a field mapping leaves out.
+_DEFAULTS = {"index": True, "doc_values": True}
+
+
+def field_type(value_type: type) -> type:
+    """
+    Unwrap Optional and list annotations to the type of the values stored in elasticsearch.
+    :param value_type: the type annotation of a dataclass field.
+    :return: the underlying value type.
+    """
+    origin = typing.get_origin(value_type)
+    if origin in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(value_type) if arg is not type(None)]
+        if len(args) == 1:
+            return field_type(args[0])
+    if origin in (list, set, tuple):
+        args = typing.get_args(value_type)
+        return field_type(args[0]) if args else object
+    return value_type
+
+
+def field_mapping(value_type: type, metadata: MetaData) -> dict:
+    """
+    Create the elasticsearch mapping of a single field.
+    :param value_type: the type annotation of the field.
+    :param metadata: the field's MetaData.
+    :return: the mapping of the field.
+    """
+    es_type = _ES_TYPES.get(field_type(value_type))
+    if es_type is None:
+        return {"type": "object", "enabled": False}
+
+    if es_type == "keyword" and metadata.es_keyword_field:
+        subfield = metadata.es_keyword_field.rsplit(".", 1)[-1]
+        mapping = {"type": "text", "fields": {subfield: {"type": "keyword"}}}
+    else:
+        mapping = {"type": es_type}
+
+    if not metadata.filterable:
+        mapping["index"] = False
+        if mapping["type"] != "text":
+            mapping["doc_values"] = False
+    return mapping
+
+
+def build_mapping(entity: Type[Entity], index_sort_field: str = None) -> dict:
+    """
+    Derive the elasticsearch index settings and mappings from an entity dataclass.
+    :param entity: the entity class.
+    :param index_sort_field: optional name of an entity field to sort the index by, newest first.
+    :return: a dict with "settings" and "mappings" that can be used as the body of an index create request.
+    """
+    type_hints = typing.get_type_hints(entity)
+    properties = {}
+    sort = None
+    for field in fields(entity):
+        metadata = MetaData(**field.metadata)
+        es_field_name = metadata.es_field_name or field.name
+        mapping = field_mapping(value_type=type_hints.get(field.name, field.type), metadata=metadata)
+        if field.name == index_sort_field:
+            if mapping["type"] not in _SORTABLE_TYPES:
+                raise ValueError(f"Field {field.name} can not be used to sort the index.")
+            mapping.pop("doc_values", None)
+            sort = {"sort.field": es_field_name, "sort.order": "desc"}
+        properties[es_field_name] = mapping
+
+    if index_sort_field and sort is None:
+        raise ValueError(f"Entity {entity.__name__} does not have field {index_sort_field}")
+
+    body = {"mappings": {"dynamic": "strict", "properties": properties}}
+    if sort:
+        body["settings"] = {"index": sort}
+    return body
+
+
+def mapping_diff(expected: dict, actual: dict, path: str = "") -> list[str]:
+    """
+    Compare expected field mappings to the mappings of an index.  Keys left out of either mapping are compared with
+    their elasticsearch defaults, so a field that is not indexed is reported even if the entity does not set index.
+    :param expected: the expected "properties" of the mapping.
+    :param actual: the "properties" of the index mapping.
+    :param path: the path of the parent field, used in the messages.
+    :return: a list of differences, empty if the index matches.
+    """
+    differences = []
+    for name, expected_field in expected.items():
+        field_path = f"{path}{name}"
+        actual_field = actual.get(name)
+        if actual_field is None:
+            differences.append(f"{field_path}: missing from index")
+            continue
+        for key in _COMPARED_KEYS:
+            expected_value = expected_field.get(key, _DEFAULTS.get(key))
+            actual_value = actual_field.get(key, _DEFAULTS.get(key))
+            if key == "fields":
+                differences.extend(mapping_diff(expected=expected_value or {}, actual=actual_value or {},
+                                                path=f"{field_path}."))
+            elif expected_value is not None and expected_value != actual_value:
+                differences.append(f"{field_path}: {key} is {actual_value}, expected {expected_value}")
+    for name in actual:
+        if name not in expected:
+            differences.append(f"{path}{name}: not defined on the entity")
+    return differences
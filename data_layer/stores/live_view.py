@@ -0,0 +1,110 @@
+from bisect import bisect_left, insort
+from collections.abc import KeysView, ValuesView
+from dataclasses import Field
+from types import MappingProxyType
+
+from data_layer.entity import Entity
+from data_layer.filters import Filter
+from data_layer.stores.change_event import ChangeEvent, ChangeType
+
+
+class LiveView:
+    """
+    The result set of a list of filters, kept current by applying the change events of a store one entity at a time.
+    Optionally ranks the matching entities by a field so the top k can be read without sorting.
+
+    Costs: applying a change evaluates the filters on the changed entity only.  When ranking, a change to a ranked
+    entity also takes a binary search plus a shift of the ranked list, O(log n) comparisons and an O(n) memory move.
+    count, keys, entities and results are O(1) read only views of the live result set; top is O(k).
+    """
+
+    def __init__(self, filters: list[Filter], sort_field: Field = None, top_k: int = None, descending: bool = True):
+        if top_k is not None and sort_field is None:
+            raise Exception("Live view top_k requires a sort_field.")
+        self.filters = filters
+        self.sort_field = sort_field
+        self.top_k = top_k
+        self.descending = descending
+        self._entities: dict[str, Entity] = {}
+        self._sort_values: dict[str, any] = {}
+        self._ranked: list[tuple[any, str]] = []
+
+    def matches(self, entity: Entity) -> bool:
+        """
+        Evaluate the view's filters on an entity.
+        """
+        return all(f.evaluate(entity) for f in self.filters)
+
+    def apply(self, event: ChangeEvent):
+        """
+        Update the view with a single change event.
+        :param event: the change event emitted by the store.
+        """
+        if event.change_type != ChangeType.DELETE and self.matches(event.entity):
+            self._put(key=event.key, entity=event.entity)
+        else:
+            self._remove(key=event.key)
+
+    def _put(self, key: str, entity: Entity):
+        self._entities[key] = entity
+        if self.sort_field is None:
+            return
+        value = getattr(entity, self.sort_field.name, None)
+        if key in self._sort_values:
+            if self._sort_values[key] == value:
+                return
+            self._unrank(key=key)
+        if value is not None:
+            self._sort_values[key] = value
+            insort(self._ranked, (value, key))
+
+    def _remove(self, key: str):
+        if self._entities.pop(key, None) is not None and self.sort_field is not None:
+            self._unrank(key=key)
+
+    def _unrank(self, key: str):
+        value = self._sort_values.pop(key, None)
+        if value is None:
+            return
+        index = bisect_left(self._ranked, (value, key))
+        del self._ranked[index]
+
+    @property
+    def count(self) -> int:
+        return len(self._entities)
+
+    @property
+    def keys(self) -> KeysView[str]:
+        return self._entities.keys()
+
+    @property
+    def entities(self) -> ValuesView[Entity]:
+        return self._entities.values()
+
+    @property
+    def results(self) -> MappingProxyType:
+        """
+        A read only mapping of key to entity of the matching entities.
+        """
+        return MappingProxyType(self._entities)
+
+    def top(self) -> list[Entity]:
+        """
+        Get the top k matching entities by the sort field.  Entities without a value for the sort field are not ranked.
+        :return: up to top_k entities, ordered by the sort field.
+        """
+        if self.sort_field is None:
+            raise Exception("Live view has no sort_field.")
+        ranked = reversed(self._ranked) if self.descending else iter(self._ranked)
+        top = []
+        for _, key in ranked:
+            if self.top_k is not None and len(top) >= self.top_k:
+                break
+            top.append(self._entities[key])
+        return top
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return f"LiveView({' AND '.join([str(f) for f in self.filters])})"
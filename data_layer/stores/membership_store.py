@@ -0,0 +1,194 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Iterator
+
+from data_layer.bloom_filter import BloomFilter
+from data_layer.entity import Entity
+from data_layer.exceptions import EntityNotFoundError
+from data_layer.filters import Filter
+from data_layer.stores.store import Page, Store
+
+
+@dataclass
+class MembershipStats:
+    lookups: int = 0
+    definite_misses: int = 0
+    negative_cache_hits: int = 0
+    backend_calls: int = 0
+    false_positives: int = 0
+    expected_false_positive_rate: float = 0.0
+
+    @property
+    def observed_false_positive_rate(self) -> float:
+        """
+        The fraction of lookups for missing keys that the Bloom filter let through to the wrapped store.
+        """
+        misses = self.definite_misses + self.false_positives
+        return self.false_positives / misses if misses else 0.0
+
+
+class MembershipStore(Store):
+    """
+    Wraps a store to answer gets for keys that do not exist without calling the wrapped store.  A Bloom filter holds
+    every key written through this store or found by the initial key scan; keys it does not contain are definite
+    misses.  Keys that the Bloom filter lets through but the wrapped store does not have are remembered in a short lived
+    negative cache.
+
+    The Bloom filter can not see writes that bypass this store, so all writes must go through it (or call rebuild
+    periodically).  Deleted keys stay in the Bloom filter until the next rebuild.
+    """
+
+    def __init__(self, store: Store, capacity: int = 1_000_000, error_rate: float = 0.01, negative_ttl: float = 5.0,
+                 negative_cache_size: int = 100_000, warm: bool = True):
+        """
+        :param store: the store to wrap.
+        :param capacity: the number of keys the Bloom filter is sized for.
+        :param error_rate: the Bloom filter false positive rate at capacity.
+        :param negative_ttl: seconds a confirmed missing key is answered from the negative cache.
+        :param negative_cache_size: the maximum number of keys in the negative cache.
+        :param warm: scan the keys of the wrapped store into the Bloom filter now.
+        """
+        super().__init__(entity=store.entity)
+        self.store = store
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.negative_ttl = negative_ttl
+        self.negative_cache_size = negative_cache_size
+        self._lock = Lock()
+        self._bloom = BloomFilter(capacity=capacity, error_rate=error_rate)
+        self._negative: OrderedDict[str, float] = OrderedDict()
+        self._rebuild_keys: set[str] | None = None
+        # Keys with a lookup in flight, and those of them written during the lookup.  A lookup that raced a write must
+        # not put the key in the negative cache.
+        self._lookups: dict[str, int] = {}
+        self._written_during_lookup: set[str] = set()
+        self._stats = MembershipStats()
+        if warm:
+            self.rebuild()
+
+    def rebuild(self, capacity: int = None):
+        """
+        Rebuild the Bloom filter from a scan of the keys in the wrapped store, e.g. to drop deleted keys or to resize.
+        :param capacity: optional new capacity of the Bloom filter.
+        """
+        bloom = BloomFilter(capacity=capacity or self.capacity, error_rate=self.error_rate)
+        with self._lock:
+            self._rebuild_keys = set()
+        try:
+            for keys in self.store.scan_keys(filters=[], page_size=10_000):
+                for key in keys:
+                    bloom.add(key)
+        except BaseException:
+            with self._lock:
+                self._rebuild_keys = None
+            raise
+        with self._lock:
+            # Keys written while the scan ran may not have been seen by it.
+            for key in self._rebuild_keys:
+                bloom.add(key)
+            self._rebuild_keys = None
+            self._bloom = bloom
+            self.capacity = bloom.capacity
+
+    def get(self, key: str) -> Entity:
+        with self._lock:
+            self._stats.lookups += 1
+            if key not in self._bloom:
+                self._stats.definite_misses += 1
+                raise EntityNotFoundError.for_key(key=key)
+            expires = self._negative.get(key)
+            if expires is not None:
+                if expires > time.monotonic():
+                    self._stats.negative_cache_hits += 1
+                    raise EntityNotFoundError.for_key(key=key)
+                del self._negative[key]
+            self._stats.backend_calls += 1
+            self._lookups[key] = self._lookups.get(key, 0) + 1
+        try:
+            return self.store.get(key=key)
+        except EntityNotFoundError:
+            with self._lock:
+                self._stats.false_positives += 1
+                if key not in self._written_during_lookup:
+                    self._remember_missing(key=key)
+            raise
+        finally:
+            with self._lock:
+                self._lookups[key] -= 1
+                if not self._lookups[key]:
+                    del self._lookups[key]
+                    self._written_during_lookup.discard(key)
+
+    def create(self, entity: Entity, key: str):
+        self.store.create(entity=entity, key=key)
+        self._remember_present(keys=[key])
+
+    def create_many(self, items: list[tuple[str, Entity]], refresh: bool = True):
+        self.store.create_many(items=items, refresh=refresh)
+        self._remember_present(keys=[key for key, _ in items])
+
+    def update(self, entity: Entity, key: str, partial: bool = False):
+        if partial:
+            self.store.patch(key=key, entity=entity)
+        else:
+            self.store.update(entity=entity, key=key)
+        self._remember_present(keys=[key])
+
+    def patch(self, key: str, entity: Entity, upsert: bool = False):
+        self.store.patch(key=key, entity=entity, upsert=upsert)
+        self._remember_present(keys=[key])
+
+    def delete(self, key: str):
+        self.store.delete(key=key)
+        with self._lock:
+            self._remember_missing(key=key)
+
+    def read(self, filters: list[Filter]) -> list[Entity]:
+        return self.store.read(filters=filters)
+
+    def read_many(self, filter_sets: list[list[Filter]]) -> list[list[Entity]]:
+        return self.store.read_many(filter_sets=filter_sets)
+
+    def scan(self, filters: list[Filter], page_size: int = 1000, after: any = None) -> Iterator[Page]:
+        return self.store.scan(filters=filters, page_size=page_size, after=after)
+
+    def scan_keys(self, filters: list[Filter], page_size: int = 1000) -> Iterator[list[str]]:
+        return self.store.scan_keys(filters=filters, page_size=page_size)
+
+    def refresh(self):
+        self.store.refresh()
+
+    def explain(self, filters: list[Filter]) -> dict:
+        return self.store.explain(filters=filters)
+
+    def profile(self, filters: list[Filter]) -> dict:
+        return self.store.profile(filters=filters)
+
+    def stats(self) -> MembershipStats:
+        with self._lock:
+            return MembershipStats(lookups=self._stats.lookups, definite_misses=self._stats.definite_misses,
+                                   negative_cache_hits=self._stats.negative_cache_hits,
+                                   backend_calls=self._stats.backend_calls,
+                                   false_positives=self._stats.false_positives,
+                                   expected_false_positive_rate=self._bloom.false_positive_rate)
+
+    def _remember_present(self, keys: list[str]):
+        with self._lock:
+            for key in keys:
+                self._bloom.add(key)
+                self._negative.pop(key, None)
+                if key in self._lookups:
+                    self._written_during_lookup.add(key)
+                if self._rebuild_keys is not None:
+                    self._rebuild_keys.add(key)
+
+    def _remember_missing(self, key: str):
+        now = time.monotonic()
+        self._negative.pop(key, None)
+        self._negative[key] = now + self.negative_ttl
+        # Entries are ordered by expiry, so expired and overflowing entries are at the front.
+        while self._negative and (len(self._negative) > self.negative_cache_size or
+                                  next(iter(self._negative.values())) <= now):
+            self._negative.popitem(last=False)
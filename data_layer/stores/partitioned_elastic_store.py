@@ -0,0 +1,285 @@
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Type
+
+from elasticsearch import Elasticsearch, NotFoundError, helpers
+
+from data_layer.entity import Entity
+from data_layer.exceptions import EntityNotFoundError
+from data_layer.filters import Filter, IsFilter, GreaterThanFilter, LessThanFilter, RangeFilter, AndFilter
+from data_layer.hydration import Hydrator
+from data_layer.stores.elastic_store import ElasticStore
+
+
+class PartitionInterval(str, Enum):
+    DAY = 'day'
+    MONTH = 'month'
+
+
+class PartitionedElasticStore(ElasticStore):
+    """
+    An ElasticStore that writes each entity to a per day or per month index, chosen by a datetime field of the entity.
+    Partitions are named "<index>-<yyyy.mm.dd>" or "<index>-<yyyy.mm>".  Reads only target the partitions that overlap
+    the range of the partition field given by the filters, and old data is removed by dropping whole partitions.
+    """
+    _formats = {PartitionInterval.DAY: "%Y.%m.%d", PartitionInterval.MONTH: "%Y.%m"}
+    # Longer index lists are replaced by the wildcard pattern, to stay below the http line length limit of elasticsearch.
+    # With whole years and months named by wildcards, only ranges of many decades get there.
+    max_index_list_length = 2048
+
+    def __init__(self, entity: Type[Entity], client: Elasticsearch, index: str, partition_field: str,
+                 interval: PartitionInterval = PartitionInterval.DAY, index_sort_field: str = None,
+                 hydrator: Hydrator = None, key_field: str = None, read_size: int = 10_000):
+        super().__init__(entity=entity, client=client, index=index, index_sort_field=index_sort_field,
+                         hydrator=hydrator, key_field=key_field, read_size=read_size)
+        if not hasattr(entity, partition_field):
+            raise ValueError(f"Entity {entity.__name__} does not have field {partition_field}")
+        self.partition_field = getattr(entity, partition_field)
+        if self.partition_field.type is not datetime:
+            raise ValueError(f"Partition field {partition_field} is not a datetime field")
+        self.interval = PartitionInterval(interval)
+        self.pattern = f"{index}-*"
+
+    def partition_start(self, value: datetime) -> datetime:
+        """
+        The start of the partition that contains a datetime.
+        """
+        value = _naive_utc(value)
+        if self.interval == PartitionInterval.DAY:
+            return datetime(year=value.year, month=value.month, day=value.day)
+        return datetime(year=value.year, month=value.month, day=1)
+
+    def partition_end(self, start: datetime) -> datetime:
+        """
+        The (exclusive) end of the partition starting at start.
+        """
+        if self.interval == PartitionInterval.DAY:
+            return datetime.fromordinal(start.toordinal() + 1)
+        return _next_month(value=start)
+
+    def partition_index(self, value: datetime) -> str:
+        """
+        The name of the partition index that contains a datetime.
+        """
+        return f"{self.index}-{self.partition_start(value):{self._formats[self.interval]}}"
+
+    def partitions(self) -> dict[str, datetime]:
+        """
+        Get the existing partition indexes.
+        :return: a dict of partition index name to the start of the partition, ordered by start.
+        """
+        partitions = {}
+        for row in self.client.cat.indices(index=self.pattern, h="index", format="json"):
+            name = row['index']
+            try:
+                start = datetime.strptime(name[len(self.index) + 1:], self._formats[self.interval])
+            except ValueError:
+                continue
+            partitions[name] = start
+        return dict(sorted(partitions.items(), key=lambda item: item[1]))
+
+    def drop_partitions_before(self, cutoff: datetime) -> list[str]:
+        """
+        Delete every partition that only contains data from before the cutoff.
+        :param cutoff: the retention cutoff.
+        :return: the names of the deleted indexes.
+        """
+        cutoff = _naive_utc(cutoff)
+        dropped = [name for name, start in self.partitions().items() if self.partition_end(start) <= cutoff]
+        if dropped:
+            self.client.indices.delete(index=",".join(dropped))
+        return dropped
+
+    def ensure_index(self) -> bool:
+        """
+        Create an index template that applies the mapping derived from the entity to every partition.
+        :return: True if the template was created.
+        """
+        name = f"{self.index}-template"
+        if self.client.indices.exists_index_template(name=name):
+            return False
+        self.client.indices.put_index_template(name=name, index_patterns=[self.pattern], template=self.mapping())
+        return True
+
+    def get(self, key: str) -> Entity:
+        doc = self._locate(key=key)
+        if doc is None:
+            raise EntityNotFoundError.for_key(key=key)
+        return self.entity.from_es(data=doc['_source'])
+
+    def create(self, entity: Entity, key: str):
+        """
+        Write the entity to its partition.  A copy of the key in another partition, written with a different value of
+        the partition field, is deleted, so every key is stored in one partition only.
+        """
+        self._replace(entity=entity, key=key)
+
+    def create_many(self, items: list[tuple[str, Entity]], refresh: bool = True):
+        """
+        Create multiple entities with a single bulk request, which also deletes the copies of the keys in other
+        partitions.  The copies are found with a search, so copies written since the last refresh are not found.
+        """
+        indexes = {key: self._write_index(entity=entity) for key, entity in items}
+        actions = [{"_op_type": "delete", "_index": hit['_index'], "_id": hit['_id']}
+                   for hit in self._search_keys(keys=list(indexes)) if hit['_index'] != indexes[hit['_id']]]
+        actions.extend({"_index": indexes[key], "_id": key, "_source": entity.to_es()} for key, entity in items)
+        helpers.bulk(self.client, actions, refresh=refresh)
+        for _, entity in items:
+            entity.mark_clean()
+
+    def update(self, entity: Entity, key: str, partial: bool = False):
+        if partial:
+            return self.patch(key=key, entity=entity)
+        self._replace(entity=entity, key=key)
+
+    def patch(self, key: str, entity: Entity, upsert: bool = False):
+        """
+        Patch the entity in the partition that holds it.  If the partition field changed, the whole entity is moved.
+        """
+        previous = self._locate(key=key)
+        if previous is None:
+            if not upsert:
+                raise EntityNotFoundError.for_key(key=key)
+            return self.create(entity=entity, key=key)
+        if self.partition_field.name in entity.dirty_fields() and previous['_index'] != self._write_index(entity=entity):
+            return self.update(entity=entity, key=key)
+        self._patch(index=previous['_index'], key=key, entity=entity, upsert=False)
+
+    def delete(self, key: str):
+        doc = self._locate(key=key)
+        if doc is None:
+            raise EntityNotFoundError.for_key(key=key)
+        try:
+            self.client.delete(index=doc['_index'], id=key, refresh=True)
+        except NotFoundError:
+            raise EntityNotFoundError.for_key(key=key)
+
+    def partition_range(self, filters: list[Filter]) -> tuple[datetime | None, datetime | None]:
+        """
+        Get the range of the partition field that the filters can match.  Only filters that must all match (top level
+        filters and AndFilters) narrow the range; bounds are treated as inclusive, so the range may be slightly wide.
+        :return: the lower and upper bound, None if unbounded.
+        """
+        lower, upper = None, None
+        for f in filters:
+            if isinstance(f, AndFilter):
+                bounds = [self.partition_range(filters=f.filters)]
+            elif f.field is None or f.field.name != self.partition_field.name:
+                continue
+            elif isinstance(f, IsFilter):
+                bounds = [(f.value, f.value)]
+            elif isinstance(f, GreaterThanFilter):
+                bounds = [(f.value, None)]
+            elif isinstance(f, LessThanFilter):
+                bounds = [(None, f.value)]
+            elif isinstance(f, RangeFilter):
+                bounds = [(f.value.get("gt", f.value.get("gte")), f.value.get("lt", f.value.get("lte")))]
+            else:
+                continue
+            for filter_lower, filter_upper in bounds:
+                if filter_lower is not None:
+                    filter_lower = _naive_utc(filter_lower)
+                    lower = filter_lower if lower is None else max(lower, filter_lower)
+                if filter_upper is not None:
+                    filter_upper = _naive_utc(filter_upper)
+                    upper = filter_upper if upper is None else min(upper, filter_upper)
+        return lower, upper
+
+    def _search_index(self, filters: list[Filter]) -> str | None:
+        """
+        Name the partitions that overlap the range of the partition field, without asking the cluster which exist.
+        Searches ignore the partitions that do not exist.  Whole years and, for daily partitions, whole months in the
+        range are named by a wildcard, e.g. "<index>-2024.*" and "<index>-2024.01.*", so long ranges stay short.  Open
+        ended ranges use the wildcard pattern.
+        """
+        lower, upper = self.partition_range(filters=filters)
+        if lower is None or upper is None:
+            return self.pattern
+        indexes = []
+        length = 0
+        start = self.partition_start(value=lower)
+        end = self.partition_end(start=self.partition_start(value=upper))
+        while start < end:
+            next_year = datetime(year=start.year + 1, month=1, day=1)
+            next_month = _next_month(value=start)
+            if start.month == 1 and start.day == 1 and next_year <= end:
+                name = f"{self.index}-{start.year:04}.*"
+                start = next_year
+            elif self.interval == PartitionInterval.DAY and start.day == 1 and next_month <= end:
+                name = f"{self.index}-{start:%Y.%m}.*"
+                start = next_month
+            else:
+                name = self.partition_index(value=start)
+                start = self.partition_end(start=start)
+            length += len(name) + 1
+            if length > self.max_index_list_length:
+                return self.pattern
+            indexes.append(name)
+        return ",".join(indexes) if indexes else None
+
+    def _search_options(self) -> dict:
+        return {"ignore_unavailable": True}
+
+    def _write_index(self, entity: Entity) -> str:
+        value = getattr(entity, self.partition_field.name)
+        if value is None:
+            raise ValueError(f"Entity is missing partition field {self.partition_field.name}")
+        return self.partition_index(value=value)
+
+    def _replace(self, entity: Entity, key: str):
+        """
+        Write the entity to its partition and delete the copy of the key in another partition, if any.
+        """
+        index = self._write_index(entity=entity)
+        previous = self._locate(key=key, index=index)
+        self.client.index(index=index, id=key, body=entity.to_es(), refresh=True)
+        if previous is not None and previous['_index'] != index:
+            self.client.delete(index=previous['_index'], id=key, refresh=True)
+        entity.mark_clean()
+
+    def _search_keys(self, keys: list[str]) -> list[dict]:
+        """
+        Find the hits of keys in any partition, without their sources.
+        """
+        hits = []
+        chunk_size = max(self.read_size // 2, 1)
+        for i in range(0, len(keys), chunk_size):
+            body = {"query": {"ids": {"values": keys[i:i + chunk_size]}}, "size": self.read_size, "_source": False}
+            hits.extend(self.client.search(index=self.pattern, body=body)['hits']['hits'])
+        return hits
+
+    def _locate(self, key: str, index: str = None) -> dict | None:
+        """
+        Find the document of a key in any partition.  Uses the realtime get APIs rather than a search, so documents are
+        found before their partition is refreshed.
+        :param index: the partition the key is expected in, which is tried first.
+        :return: the document, with its _index and _source, or None if no partition has the key.
+        """
+        if index is not None:
+            try:
+                return self.client.get(index=index, id=key)
+            except NotFoundError:
+                pass
+        partitions = [name for name in self.partitions() if name != index]
+        if not partitions:
+            return None
+        response = self.client.mget(docs=[{"_index": name, "_id": key} for name in partitions])
+        return next((doc for doc in response['docs'] if doc.get('found')), None)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """
+    Partitions are named in UTC; convert timezone aware datetimes to naive UTC datetimes so they can be compared.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _next_month(value: datetime) -> datetime:
+    """
+    The start of the month after the month of a datetime.
+    """
+    if value.month == 12:
+        return datetime(year=value.year + 1, month=1, day=1)
+    return datetime(year=value.year, month=value.month + 1, day=1)
@@ -1,10 +1,19 @@
+import time
 from abc import ABC, abstractmethod
-from typing import Type
+from dataclasses import dataclass
+from typing import Iterator, Type
 
 from data_layer.entity import Entity
+from data_layer.exceptions import UnsupportedOperationError
 from data_layer.filters import Filter
 
 
+@dataclass
+class Page:
+    items: list[tuple[str, Entity]]
+    cursor: any
+
+
 class Store(ABC):
 
     def __init__(self, entity: Type[Entity]):
@@ -19,9 +28,25 @@ class Store(ABC):
         pass
 
     @abstractmethod
-    def update(self, entity: Entity, key: str):
+    def update(self, entity: Entity, key: str, partial: bool = False):
+        """
+        Replace the entity stored under the key.
+        :param partial: only write the fields modified since the entity was loaded, see patch.
+        """
         pass
 
+    def patch(self, key: str, entity: Entity, upsert: bool = False):
+        """
+        Write only the fields of the entity that were modified since it was loaded (Entity.dirty_fields).  Stores that
+        support partial writes override this; by default the whole entity is written with update.
+        :param key: the key of the stored entity.
+        :param entity: the entity holding the modified fields.
+        :param upsert: create the entity if it does not exist, instead of raising EntityNotFoundError.
+        """
+        if not upsert:
+            self.get(key=key)
+        self.update(entity=entity, key=key)
+
     @abstractmethod
     def delete(self, key: str):
         pass
@@ -29,3 +54,68 @@ class Store(ABC):
     @abstractmethod
     def read(self, filters: list[Filter]) -> list[Entity]:
         pass
+
+    def read_many(self, filter_sets: list[list[Filter]]) -> list[list[Entity]]:
+        """
+        Execute several independent reads.  Stores that can batch reads override this.
+        :param filter_sets: a list of filter lists, one per read.
+        :return: a list of results, one per filter list, in the same order.
+        """
+        return [self.read(filters=filters) for filters in filter_sets]
+
+    def explain(self, filters: list[Filter]) -> dict:
+        """
+        Describe how the store would execute a read with the filters, without executing it.  Stores override this to
+        describe their backend query.
+        """
+        return {
+            "store": self.__class__.__name__,
+            "plan": [{"filter": str(f), "definition": f.to_dict()} for f in filters]
+        }
+
+    def profile(self, filters: list[Filter]) -> dict:
+        """
+        Execute a read with the filters and report where the time was spent.  Stores override this to break the time
+        down; by default only the total is reported.
+        """
+        start = time.perf_counter_ns()
+        hits = self.read(filters=filters)
+        return {
+            **self.explain(filters=filters),
+            "hits": len(hits),
+            "total_ms": (time.perf_counter_ns() - start) / 1e6
+        }
+
+    def scan(self, filters: list[Filter], page_size: int = 1000, after: any = None) -> Iterator[Page]:
+        """
+        Iterate over the keys and entities matching the filters in pages.  read does not return keys, so stores have
+        to override this to support scans.
+        :param filters: the filters to match.
+        :param page_size: the number of entities per page.
+        :param after: the cursor of a previously returned page, to resume the scan after that page.
+        :return: an iterator of pages.  Each page has a json serializable cursor.
+        """
+        raise UnsupportedOperationError.for_operation(store=self, operation="scan")
+
+    def scan_keys(self, filters: list[Filter], page_size: int = 1000) -> Iterator[list[str]]:
+        """
+        Iterate over the keys of the entities matching the filters in pages.  Stores that can skip loading the
+        entities override this.
+        """
+        for page in self.scan(filters=filters, page_size=page_size):
+            yield [key for key, _ in page.items]
+
+    def create_many(self, items: list[tuple[str, Entity]], refresh: bool = True):
+        """
+        Create multiple entities.  Stores that support bulk writes override this.
+        :param items: a list of (key, entity) tuples.
+        :param refresh: make the entities visible to reads immediately.
+        """
+        for key, entity in items:
+            self.create(entity=entity, key=key)
+
+    def refresh(self):
+        """
+        Make all writes visible to reads.  Only needed after writes made with refresh=False.
+        """
+        pass
@@ -1,5 +1,5 @@
 from elasticsearch import Elasticsearch
-from data_layer import ElasticStore, DictStore
+from data_layer import ElasticStore, DictStore, PartitionedElasticStore, PartitionInterval
 from data_layer.tests.data import TestEntity, test_entities
 import pytest
 
@@ -12,6 +12,16 @@ def es_store():
     return ElasticStore(entity=TestEntity, client=es_client, index="test_index")
 
 
+@pytest.fixture
+def partitioned_es_store():
+    """Fixture that provides a monthly PartitionedElasticStore for the test entity, and drops its partitions."""
+    store = PartitionedElasticStore(entity=TestEntity, client=es_client, index="test_partitioned",
+                                    partition_field="timestamp", interval=PartitionInterval.MONTH)
+    store.ensure_index()
+    yield store
+    es_client.indices.delete(index=store.pattern, ignore=[400, 404])
+
+
 @pytest.fixture
 def dict_store():
     """Fixture that provides a DictStore object for the test entity."""
@@ -20,19 +30,9 @@ def dict_store():
 
 def setup_test_entity():
     """Helper function to set up a test entity in Elasticsearch."""
-    index = "test_index"
-    es_client.indices.delete(index=index, ignore=[400, 404])
-    mapping = {
-        "mappings": {
-            "properties": {
-                "key": {"type": "keyword"},
-                "count": {"type": "integer"},
-                "name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-                "@timestamp": {"type": "date"}
-            }
-        }
-    }
-    es_client.indices.create(index=index, body=mapping)
+    store = ElasticStore(entity=TestEntity, client=es_client, index="test_index")
+    es_client.indices.delete(index=store.index, ignore=[400, 404])
+    store.ensure_index()
 
 
 @pytest.fixture
@@ -1,9 +1,11 @@
+from dataclasses import dataclass
+
 import pytest
 
 from data_layer.tests.data import TestEntity
 from data_layer import (IsFilter, IsNotFilter, GreaterThanFilter, LessThanFilter, ExistsFilter, DoesNotExistFilter,
-                        OrFilter, Filter, IsOneOfFilter, IsNotOneOfFilter)
-from data_layer import FilterFactory
+                        OrFilter, AndFilter, NotFilter, RangeFilter, Filter, IsOneOfFilter, IsNotOneOfFilter)
+from data_layer import FilterFactory, FilterCache, Entity
 from datetime import datetime
 
 
@@ -21,6 +23,14 @@ from datetime import datetime
     ([DoesNotExistFilter(field=TestEntity.name)], set()),
     ([OrFilter(filters=[IsFilter(field=TestEntity.count, value=1),
                         IsFilter(field=TestEntity.count, value=4)])], {"1", "4"}),
+    ([OrFilter(filters=[AndFilter(filters=[GreaterThanFilter(field=TestEntity.count, value=1),
+                                           LessThanFilter(field=TestEntity.count, value=4)]),
+                        IsFilter(field=TestEntity.key, value="5")])], {"2", "3", "5"}),
+    ([NotFilter(filter=IsOneOfFilter(field=TestEntity.count, value=[1, 4]))], {"2", "3", "5"}),
+    ([RangeFilter(field=TestEntity.count, gte=2, lt=5)], {"2", "3", "4"}),
+    ([RangeFilter(field=TestEntity.count, gt=2, lte=5)], {"4", "5"}),
+    ([RangeFilter(field=TestEntity.timestamp, gte=datetime(year=2024, month=1, day=1),
+                  lt=datetime(year=2024, month=3, day=1))], {"3", "4"}),
 ])
 def test_filters(setup_teardown_test_entities, store: str, filters: list[Filter], keys: set):
     """
@@ -77,7 +87,12 @@ def test_es_field_name(setup_teardown_test_entities, store, filters: list[Filter
     ({"field": "count", "operator": "exists"}, ExistsFilter),
     ({"field": "count", "operator": "does_not_exist"}, DoesNotExistFilter),
     ({"operator": "or", "filters": [{"field": "count", "operator": "is", "value": 2},
-                                    {"field": "count", "operator": "is", "value": 3}]}, OrFilter)
+                                    {"field": "count", "operator": "is", "value": 3}]}, OrFilter),
+    ({"operator": "and", "filters": [{"field": "count", "operator": "gt", "value": 2},
+                                     {"field": "count", "operator": "lt", "value": 5}]}, AndFilter),
+    ({"operator": "not", "filter": {"field": "count", "operator": "is", "value": 2}}, NotFilter),
+    ({"field": "count", "operator": "range", "value": {"gte": 2, "lt": 5}}, RangeFilter),
+    ({"field": "timestamp", "operator": "range", "value": {"gt": "2024-01-01T00:00:00"}}, RangeFilter)
 ])
 def test_from_dict_to_dict(filter_dict: dict, expected_filter: type(Filter)):
     """
@@ -89,4 +104,54 @@ def test_from_dict_to_dict(filter_dict: dict, expected_filter: type(Filter)):
     assert data_filter.to_dict() == filter_dict
 
 
+@pytest.mark.parametrize("filter_dict, message", [
+    ({"operator": "range", "value": {"gte": 2}}, "Range filter missing field."),
+    ({"operator": "not"}, "Not filter missing filter."),
+])
+def test_from_dict_missing(filter_dict: dict, message: str):
+    """
+    Test that incomplete filter dicts raise the filter's missing field or filter error.
+    """
+    with pytest.raises(Exception, match=message):
+        FilterFactory.filter_from_dict(filter_dict=filter_dict, entity=TestEntity)
+
+
+def test_filter_cache():
+    """
+    Test that the filter cache returns the same frozen filter for equivalent dicts and evicts the least recently used.
+    """
+    cache = FilterCache(max_size=2)
+    filter_dict = {"field": "count", "operator": "is_in", "value": [2, 3]}
+    data_filter = cache.filter_from_dict(filter_dict=filter_dict, entity=TestEntity)
+    assert cache.filter_from_dict(filter_dict=dict(reversed(filter_dict.items())), entity=TestEntity) is data_filter
+    assert data_filter == FilterFactory.filter_from_dict(filter_dict=filter_dict, entity=TestEntity).freeze()
+    assert data_filter.elasticsearch_query == data_filter.to_elasticsearch()
+    with pytest.raises(AttributeError):
+        data_filter.value = [4]
+    with pytest.raises(AttributeError):
+        data_filter.value.append(4)
+    with pytest.raises(TypeError):
+        data_filter.elasticsearch_query["terms"]["count"] = [4]
+    assert cache.filter_from_dict(filter_dict=filter_dict, entity=TestEntity).to_dict() == filter_dict
+
+    cache.filter_from_dict(filter_dict={"field": "count", "operator": "gt", "value": 2}, entity=TestEntity)
+    cache.filter_from_dict(filter_dict={"field": "count", "operator": "lt", "value": 2}, entity=TestEntity)
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (2, 3, 1, 2)
+
+
+def test_filter_equality():
+    """
+    Test that frozen filters are equal by value on the same entity field, and other filters only to themselves.
+    """
+    @dataclass
+    class OtherEntity(Entity):
+        count: int
 
+    data_filter = AndFilter(filters=[IsFilter(field=TestEntity.count, value=1)])
+    assert data_filter != AndFilter(filters=[IsFilter(field=TestEntity.count, value=1)])
+    assert data_filter in {data_filter}
+    data_filter.freeze()
+    assert data_filter == AndFilter(filters=[IsFilter(field=TestEntity.count, value=1)]).freeze()
+    assert hash(data_filter) == hash(AndFilter(filters=[IsFilter(field=TestEntity.count, value=1)]).freeze())
+    assert data_filter != AndFilter(filters=[IsFilter(field=OtherEntity.count, value=1)]).freeze()
@@ -1,7 +1,22 @@
+import asyncio
+import copy
+import json
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
 import pytest
+from elasticsearch import NotFoundError
 
-from data_layer.exceptions import EntityNotFoundError
-from data_layer.tests.data import TestEntity
+from data_layer import (DictStore, GreaterThanFilter, LessThanFilter, RangeFilter, ChangeType, CoalescingStore,
+                        ElasticStore, PartitionedElasticStore, PartitionInterval, MembershipStore, BloomFilter,
+                        copy_store, Hydrator, ExecutorType)
+from data_layer.exceptions import EntityNotFoundError, UnsupportedOperationError
+from data_layer.stores.store import Store
+from data_layer.stores.es_mapping import build_mapping, mapping_diff
+from data_layer.tests.data import TestEntity, test_entities
 
 
 @pytest.mark.parametrize("store", ['dict_store', 'es_store'])
@@ -25,5 +40,422 @@ def test_crud(store, request):
         store.get(key="1")
 
 
+def test_dict_store_live_view():
+    """
+    Test that a live view and the change feed follow creates, updates and deletes.
+    """
+    store = DictStore(entity=TestEntity)
+    events = []
+    store.subscribe(events.append)
+    store.create(entity=TestEntity(key="1", count=1), key="1")
+    view = store.create_view(filters=[GreaterThanFilter(field=TestEntity.count, value=1)],
+                             sort_field=TestEntity.count, top_k=2)
+    assert view.count == 0
+
+    for key, count in [("2", 5), ("3", 3), ("4", 4)]:
+        store.create(entity=TestEntity(key=key, count=count), key=key)
+    assert [entity.key for entity in view.top()] == ["2", "4"]
+
+    entity = store.get(key="2")
+    entity.count = 0
+    store.update(entity=entity, key="2")
+    store.delete(key="3")
+    assert view.count == 1
+    assert [entity.key for entity in view.top()] == ["4"]
+    assert list(view.keys) == ["4"] and list(view.results) == ["4"]
+    assert [event.change_type for event in events] == [ChangeType.CREATE] * 4 + [ChangeType.UPDATE, ChangeType.DELETE]
+
+
+class SlowDictStore(DictStore):
+
+    def get(self, key: str) -> TestEntity:
+        time.sleep(0.1)
+        return super().get(key=key)
+
+
+def test_coalescing_store():
+    """
+    Test that concurrent identical gets share one backend call, from threads and from asyncio tasks.
+    """
+    store = CoalescingStore(store=SlowDictStore(entity=TestEntity))
+    entity = TestEntity(key="1", count=1)
+    store.create(entity=entity, key="1")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: store.get(key="1"), range(8)))
+    assert results == [entity] * 8
+    assert store.stats().backend_calls == 1
+
+    async def get_many():
+        return await asyncio.gather(*[store.aget(key="2") for _ in range(8)], return_exceptions=True)
+
+    errors = asyncio.run(get_many())
+    assert all(isinstance(error, EntityNotFoundError) for error in errors)
+    stats = store.stats()
+    assert (stats.calls, stats.backend_calls, stats.deduplicated) == (16, 2, 14)
+
+
+def test_build_mapping():
+    """
+    Test that the elasticsearch mapping is derived from the entity's annotations and metadata.
+    """
+    mapping = build_mapping(entity=TestEntity, index_sort_field="timestamp")
+    assert mapping == {
+        "settings": {"index": {"sort.field": "@timestamp", "sort.order": "desc"}},
+        "mappings": {
+            "dynamic": "strict",
+            "properties": {
+                "key": {"type": "keyword"},
+                "count": {"type": "long"},
+                "name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+                "@timestamp": {"type": "date"}
+            }
+        }
+    }
+    assert mapping_diff(expected=mapping["mappings"]["properties"],
+                        actual={"key": {"type": "text"}, "count": {"type": "long"}, "@timestamp": {"type": "date"}}) \
+        == ["key: type is text, expected keyword", "name: missing from index"]
+    properties = copy.deepcopy(mapping["mappings"]["properties"])
+    properties["key"]["index"] = False
+    properties["count"]["doc_values"] = False
+    assert mapping_diff(expected=mapping["mappings"]["properties"], actual=properties) \
+        == ["key: index is False, expected True", "count: doc_values is False, expected True"]
+
+
+@pytest.mark.parametrize("store", ['es_store'])
+def test_es_mapping_diff(store, request):
+    """
+    Test that the test index was created with the mapping derived from the entity.
+    """
+    store = request.getfixturevalue(store)
+    assert store.mapping_diff() == []
+
+
+@pytest.mark.parametrize("store", ['dict_store', 'es_store'])
+def test_explain_profile(setup_teardown_test_entities, store):
+    """
+    Test that explain describes a read and profile executes it.
+    """
+    store = setup_teardown_test_entities
+    filters = [GreaterThanFilter(field=TestEntity.count, value=1), LessThanFilter(field=TestEntity.count, value=5)]
+    assert store.explain(filters=filters)["store"] == store.__class__.__name__
+    assert store.profile(filters=filters)["hits"] == 3
+
+
+def test_partition_range():
+    """
+    Test that partitions are named by interval and that the partition field range is derived from the filters.
+    """
+    store = PartitionedElasticStore(entity=TestEntity, client=None, index="events", partition_field="timestamp")
+    assert store.partition_index(value=datetime(year=2024, month=2, day=29, hour=23)) == "events-2024.02.29"
+    assert store.partition_end(start=datetime(year=2024, month=2, day=29)) == datetime(year=2024, month=3, day=1)
+    filters = [GreaterThanFilter(field=TestEntity.timestamp, value=datetime(year=2024, month=1, day=1)),
+               RangeFilter(field=TestEntity.timestamp, lt=datetime(year=2024, month=3, day=1)),
+               GreaterThanFilter(field=TestEntity.count, value=1)]
+    assert store.partition_range(filters=filters) == (datetime(year=2024, month=1, day=1),
+                                                      datetime(year=2024, month=3, day=1))
+    assert store.explain(filters=filters)["index"] == "events-2024.01.*,events-2024.02.*,events-2024.03.01"
+    year = [RangeFilter(field=TestEntity.timestamp, gte=datetime(year=2023, month=1, day=1),
+                        lt=datetime(year=2024, month=1, day=1))]
+    assert store.explain(filters=year)["index"] == "events-2023.*,events-2024.01.01"
+    years = [RangeFilter(field=TestEntity.timestamp, gte=datetime(year=2023, month=12, day=31),
+                         lte=datetime(year=2025, month=2, day=2, hour=12))]
+    assert store.explain(filters=years)["index"] == "events-2023.12.31,events-2024.*,events-2025.01.*," \
+                                                    "events-2025.02.01,events-2025.02.02"
+    open_ended = [GreaterThanFilter(field=TestEntity.timestamp, value=datetime(year=2024, month=1, day=1))]
+    assert store.explain(filters=open_ended)["index"] == "events-*"
+    monthly = PartitionedElasticStore(entity=TestEntity, client=None, index="events", partition_field="timestamp",
+                                      interval=PartitionInterval.MONTH)
+    assert monthly.explain(filters=years)["index"] == "events-2023.12,events-2024.*,events-2025.01,events-2025.02"
+
+
+def test_partitioned_read_many_single_request():
+    """
+    Test that read_many on a partitioned store sends a single _msearch request and nothing else.
+    """
+    client = MagicMock()
+    client.msearch.return_value = {"responses": [{"hits": {"hits": []}}] * 2}
+    store = PartitionedElasticStore(entity=TestEntity, client=client, index="events", partition_field="timestamp")
+    filter_sets = [[RangeFilter(field=TestEntity.timestamp, gte=datetime(year=2024, month=1, day=1),
+                                lt=datetime(year=2024, month=1, day=3))],
+                   [GreaterThanFilter(field=TestEntity.count, value=1)]]
+    assert store.read_many(filter_sets=filter_sets) == [[], []]
+    assert [call[0] for call in client.method_calls] == ["msearch"]
+    headers = client.msearch.call_args.kwargs["searches"][::2]
+    assert [header["index"] for header in headers] == ["events-2024.01.01,events-2024.01.02,events-2024.01.03",
+                                                       "events-*"]
+
+
+def test_partitioned_get_realtime():
+    """
+    Test that get on a partitioned store finds a key with a realtime multi get over the partitions, not a search.
+    """
+    client = MagicMock()
+    client.cat.indices.return_value = [{"index": "events-2024.01.01"}, {"index": "events-2024.01.02"}]
+    client.mget.return_value = {"docs": [{"_index": "events-2024.01.01", "_id": "3", "found": False},
+                                         {"_index": "events-2024.01.02", "_id": "3", "found": True,
+                                          "_source": test_entities[2].to_es()}]}
+    store = PartitionedElasticStore(entity=TestEntity, client=client, index="events", partition_field="timestamp")
+    assert store.get(key="3") == test_entities[2]
+    assert client.mget.call_args.kwargs["docs"] == [{"_index": "events-2024.01.01", "_id": "3"},
+                                                    {"_index": "events-2024.01.02", "_id": "3"}]
+    client.search.assert_not_called()
+
+
+def test_partitioned_create_replaces_copy():
+    """
+    Test that creating a key in one partition deletes its copy in another partition.
+    """
+    client = MagicMock()
+    client.get.side_effect = NotFoundError("not found", meta=MagicMock(status=404), body={})
+    client.cat.indices.return_value = [{"index": "events-2024.01.01"}, {"index": "events-2024.01.02"}]
+    client.mget.return_value = {"docs": [{"_index": "events-2024.01.01", "_id": "3", "found": True,
+                                          "_source": test_entities[2].to_es()}]}
+    client.search.return_value = {"hits": {"hits": [{"_index": "events-2024.01.01", "_id": "3"}]}}
+    store = PartitionedElasticStore(entity=TestEntity, client=client, index="events", partition_field="timestamp")
+    entity = TestEntity(key="3", count=2, timestamp=datetime(year=2024, month=1, day=2))
+
+    store.create(entity=entity, key="3")
+    assert client.index.call_args.kwargs["index"] == "events-2024.01.02"
+    assert client.delete.call_args.kwargs["index"] == "events-2024.01.01"
+
+    with patch("data_layer.stores.partitioned_elastic_store.helpers.bulk") as bulk:
+        store.create_many(items=[("3", entity)], refresh=False)
+    assert [(action.get("_op_type", "index"), action["_index"]) for action in bulk.call_args.args[1]] \
+        == [("delete", "events-2024.01.01"), ("index", "events-2024.01.02")]
+
+
+def test_partitioned_es_store(partitioned_es_store):
+    """
+    Test that writes go to monthly partitions, reads only target overlapping partitions and partitions can be dropped.
+    """
+    store = partitioned_es_store
+    for entity in test_entities:
+        store.create(entity=entity, key=entity.key)
+    assert len(store.partitions()) == 5
+    assert store.get(key="3") == test_entities[2]
+
+    filters = [RangeFilter(field=TestEntity.timestamp, gt=datetime(year=2024, month=1, day=15),
+                           lt=datetime(year=2024, month=4, day=15))]
+    assert store.explain(filters=filters)["index"] == "test_partitioned-2024.01,test_partitioned-2024.02," \
+                                                     "test_partitioned-2024.03,test_partitioned-2024.04"
+    assert {entity.key for entity in store.read(filters=filters)} == {"4", "5"}
+
+    assert store.drop_partitions_before(cutoff=datetime(year=2024, month=1, day=1)) == ["test_partitioned-2023.01",
+                                                                                        "test_partitioned-2023.02"]
+    assert {entity.key for entity in store.read(filters=[])} == {"3", "4", "5"}
+
+
+def test_copy_store(tmp_path):
+    """
+    Test that copy_store copies every entity with parallel writers and resumes from a checkpoint.
+    """
+    src = DictStore(entity=TestEntity)
+    for entity in test_entities:
+        src.create(entity=entity, key=entity.key)
+
+    dst = DictStore(entity=TestEntity)
+    progress = copy_store(src=src, dst=dst, workers=3, page_size=2)
+    assert (progress.copied, progress.pages) == (5, 3)
+    assert dst.data == src.data
+
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(json.dumps({"copied": 2, "pages": 1, "cursor": "2"}))
+    dst = DictStore(entity=TestEntity)
+    progress = copy_store(src=src, dst=dst, filters=[LessThanFilter(field=TestEntity.count, value=5)],
+                          page_size=2, checkpoint=str(checkpoint))
+    assert progress.copied == 4
+    assert set(dst.data) == {"3", "4"}
+    assert not checkpoint.exists()
+
+    def fail(progress):
+        raise OSError("disk full")
 
+    with pytest.raises(OSError):
+        copy_store(src=src, dst=DictStore(entity=TestEntity), page_size=2, checkpoint=str(checkpoint),
+                   on_progress=fail)
+    assert checkpoint.exists()
+
+
+@pytest.mark.parametrize("store", ['dict_store', 'es_store'])
+def test_patch(store, request):
+    """
+    Test that only modified fields are tracked and written by patch, and that patch can upsert.
+    """
+    store = request.getfixturevalue(store)
+    store.create(entity=TestEntity(key="1", count=1, name="test 1"), key="1")
+    entity = store.get(key="1")
+    assert entity.dirty_fields() == []
+
+    entity.count = 2
+    assert entity.dirty_fields() == ["count"]
+    store.update(entity=entity, key="1", partial=True)
+    assert entity.dirty_fields() == []
+    assert store.get(key="1") == TestEntity(key="1", count=2, name="test 1")
+
+    with pytest.raises(EntityNotFoundError):
+        store.patch(key="2", entity=TestEntity(key="2", count=2))
+    store.patch(key="2", entity=TestEntity(key="2", count=2), upsert=True)
+    assert store.get(key="2") == TestEntity(key="2", count=2)
+
+    for entity_copy in [copy.copy(entity), copy.deepcopy(entity)]:
+        entity_copy.name = "copy"
+        assert entity_copy.dirty_fields() == ["name"]
+        assert entity.dirty_fields() == []
+
+    store.delete(key="1")
+    store.delete(key="2")
+
+
+def test_membership_store():
+    """
+    Test that gets for keys that were never written are answered without calling the wrapped store.
+    """
+    backend = DictStore(entity=TestEntity)
+    backend.create(entity=TestEntity(key="1", count=1), key="1")
+    store = MembershipStore(store=backend, capacity=1000)
+    store.create(entity=TestEntity(key="2", count=2), key="2")
+    assert store.get(key="1").count == 1
+    assert store.get(key="2").count == 2
+
+    for key in range(3, 103):
+        with pytest.raises(EntityNotFoundError):
+            store.get(key=str(key))
+    store.delete(key="2")
+    with pytest.raises(EntityNotFoundError):
+        store.get(key="2")
+
+    stats = store.stats()
+    assert stats.lookups == 103
+    assert stats.backend_calls == 2 + stats.false_positives
+    assert stats.negative_cache_hits == 1
+    assert stats.definite_misses + stats.false_positives == 100
+    assert stats.observed_false_positive_rate < 0.1
+
+
+def test_membership_store_write_during_lookup():
+    """
+    Test that a miss that raced a create of the same key does not hide the key in the negative cache.
+    """
+    class RacingDictStore(DictStore):
+
+        def get(self, key: str) -> TestEntity:
+            if key == "1" and "1" not in self.data and not racing.is_set():
+                racing.set()
+                store.create(entity=TestEntity(key="1", count=1), key="1")
+                raise EntityNotFoundError.for_key(key=key)
+            return super().get(key=key)
+
+    racing = threading.Event()
+    store = MembershipStore(store=RacingDictStore(entity=TestEntity), capacity=10)
+    store._bloom.add("1")
+    with pytest.raises(EntityNotFoundError):
+        store.get(key="1")
+    assert store.get(key="1").count == 1
+
+
+def test_bloom_filter():
+    """
+    Test that the Bloom filter has no false negatives and about the configured false positive rate.
+    """
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    for key in range(10_000):
+        bloom.add(str(key))
+    assert all(str(key) in bloom for key in range(10_000))
+    false_positives = sum(str(key) in bloom for key in range(10_000, 20_000))
+    assert false_positives < 200
+    assert bloom.false_positive_rate == pytest.approx(0.01, rel=0.2)
+
+
+@pytest.mark.parametrize("executor_type", [ExecutorType.PROCESS, ExecutorType.THREAD])
+def test_hydrator(executor_type):
+    """
+    Test that parallel hydration returns the same entities, in order, as inline hydration.
+    """
+    sources = [entity.to_es() for entity in test_entities] * 20
+    with Hydrator(max_workers=2, chunk_size=7, min_parallel=50, executor_type=executor_type) as hydrator:
+        assert hydrator.hydrate(entity=TestEntity, sources=sources) == test_entities * 20
+        assert hydrator.hydrate(entity=TestEntity, sources=sources[:5]) == test_entities
+        with pytest.raises(ValueError):
+            hydrator.hydrate(entity=TestEntity, sources=[{"count": "not a number"}] * 100)
+
+
+def test_elastic_store_parallel_hydration():
+    """
+    Test that a read asks for more than the default 10 hits and hydrates a large result with the worker pool.
+    """
+    client = MagicMock()
+    hits = [{"_id": entity.key, "_source": entity.to_es()} for entity in test_entities] * 200
+    client.search.return_value = {"hits": {"hits": hits}}
+    with Hydrator(max_workers=2, executor_type=ExecutorType.THREAD) as hydrator:
+        store = ElasticStore(entity=TestEntity, client=client, index="test", hydrator=hydrator)
+        assert store.read(filters=[]) == test_entities * 200
+        assert hydrator._executor is not None
+    assert client.search.call_args.kwargs["body"]["size"] == 10_000
+
+
+@pytest.mark.parametrize("store", ['dict_store', 'es_store'])
+def test_read_many(setup_teardown_test_entities, store):
+    """
+    Test that read_many returns the results of each read, in order.
+    """
+    store = setup_teardown_test_entities
+    filter_sets = [[GreaterThanFilter(field=TestEntity.count, value=3)],
+                   [],
+                   [LessThanFilter(field=TestEntity.count, value=0)],
+                   [RangeFilter(field=TestEntity.count, gte=2, lte=2)]]
+    results = store.read_many(filter_sets=filter_sets)
+    assert [{entity.key for entity in result} for result in results] == [{"4", "5"}, {"1", "2", "3", "4", "5"}, set(),
+                                                                        {"2", "3"}]
+
+
+class MinimalStore(Store):
+    """
+    A store implementing only the required methods, with the update signature of stores written before partial updates.
+    """
+
+    def __init__(self):
+        super().__init__(entity=TestEntity)
+        self.data = {}
+
+    def get(self, key: str) -> TestEntity:
+        try:
+            return self.data[key]
+        except KeyError:
+            raise EntityNotFoundError.for_key(key=key)
+
+    def create(self, entity: TestEntity, key: str):
+        self.data[key] = entity
+
+    def update(self, entity: TestEntity, key: str):
+        self.data[key] = entity
+
+    def delete(self, key: str):
+        del self.data[key]
+
+    def read(self, filters: list) -> list[TestEntity]:
+        return [entity for entity in self.data.values() if all(f.evaluate(entity) for f in filters)]
+
+
+def test_store_defaults():
+    """
+    Test the default implementations of the optional Store methods.
+    """
+    store = MinimalStore()
+    store.create(entity=TestEntity(key="1", count=1), key="1")
+    filters = [GreaterThanFilter(field=TestEntity.count, value=0)]
+    assert store.explain(filters=filters)["plan"][0]["filter"] == "count is greater than 0"
+    assert store.profile(filters=filters)["hits"] == 1
+    assert store.read_many(filter_sets=[filters, []]) == [[TestEntity(key="1", count=1)]] * 2
+
+    with pytest.raises(EntityNotFoundError):
+        store.patch(key="2", entity=TestEntity(key="2", count=2))
+    store.patch(key="2", entity=TestEntity(key="2", count=2), upsert=True)
+    assert store.get(key="2").count == 2
+    with pytest.raises(UnsupportedOperationError):
+        list(store.scan(filters=[]))
 
+    for wrapper in [CoalescingStore(store=store), MembershipStore(store=store, warm=False)]:
+        wrapper.update(entity=TestEntity(key="2", count=3), key="2")
+        wrapper.update(entity=TestEntity(key="2", count=4), key="2", partial=True)
+        assert store.get(key="2").count == 4
@@ -1,4 +1,6 @@
+from collections.abc import Mapping
 from datetime import datetime
+from types import MappingProxyType
 
 
 def parse(value_type: type, value: any):
@@ -29,9 +31,36 @@ def serialize(value: any):
     """
     if value is None:
         return None
-    if isinstance(value, list):
+    if isinstance(value, (list, tuple)):
         return [serialize(v) for v in value]
+    elif isinstance(value, Mapping):
+        return {k: serialize(v) for k, v in value.items()}
     elif isinstance(value, datetime):
         return value.isoformat()
     return value
 
+
+class FrozenDict(dict):
+    """
+    A dict that can not be modified.  Unlike MappingProxyType it is a dict, so it can be serialized to json.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("FrozenDict can not be modified.")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
+def freeze(value: any, mapping_type: type = MappingProxyType):
+    """
+    Recursively convert lists to tuples and dicts to immutable mappings.
+    :param value: the value to freeze.
+    :param mapping_type: the immutable mapping type dicts are converted to.
+    :return: the frozen value.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v, mapping_type) for v in value)
+    elif isinstance(value, Mapping):
+        return mapping_type({k: freeze(v, mapping_type) for k, v in value.items()})
+    return value
@@ -13,5 +13,8 @@ setup(name='data-layer',
       license='MIT',
       packages=find_packages(),
       include_package_data=True,
+      extras_require={
+          'elasticsearch': ['elasticsearch>=8.15,<9'],
+      },
       python_requires='>=3.11'
       )